@@ -36,26 +36,47 @@ import mlhub.utils as utils
 import os
 import sys
 
+logger = logging.getLogger(__name__)
+
 # ----------------------------------------------------------------------
 # Set up log.
 # ----------------------------------------------------------------------
 
-# Initialize log dir.  Ensure it exists.
-
-utils.create_log_dir()
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+def setup_log():
+    """Add the file log handler to log into a rotated log file.
 
-# Add file log handler to log all into a file
+    The log file is only opened once the first record at or above
+    LOG_FILE_LEVEL is logged.  Records below it are dropped by the logger
+    without being formatted.
+    """
 
-utils.add_log_handler(
-    logger,
-    logging.FileHandler(constants.LOG_FILE),
-    constants.LOG_FILE_LEVEL,
-    constants.LOG_FILE_FORMAT)
+    if any(isinstance(h, utils.LazyLogFileHandler) for h in logger.handlers):
+        return
 
-logger.info('---------- {} {} ----------'.format(os.path.basename(sys.argv[0]), ' '.join(sys.argv[1:])))
+    handler = utils.LazyLogFileHandler(
+        constants.LOG_FILE,
+        utils.get_env_number(
+            "MLHUB_LOG_MAX_BYTES", constants.LOG_FILE_MAX_BYTES),
+        utils.get_env_number(
+            "MLHUB_LOG_BACKUP_COUNT", constants.LOG_FILE_BACKUP_COUNT))
+    try:
+        utils.add_log_handler(
+            logger,
+            handler,
+            constants.LOG_FILE_LEVEL,
+            constants.LOG_FILE_FORMAT)
+    except ValueError:
+        utils.print_on_stderr(
+            "Warning: unknown log level '{}' in MLHUB_LOG_LEVEL, using {}.",
+            constants.LOG_FILE_LEVEL,
+            logging.getLevelName(constants.LOG_FILE_DEFAULT_LEVEL))
+        utils.add_log_handler(
+            logger,
+            handler,
+            constants.LOG_FILE_DEFAULT_LEVEL,
+            constants.LOG_FILE_FORMAT)
+    logger.setLevel(handler.level)
 
 # ----------------------------------------------------------------------
 # Set up command line parser and dispatch commands.
@@ -65,11 +86,14 @@ logger.info('---------- {} {} ----------'.format(os.path.basename(sys.argv[0]),
 def main():
     """Main program for the command line script."""
 
+    setup_log()
+    logger.debug('---------- {} {} ----------'.format(os.path.basename(sys.argv[0]), ' '.join(sys.argv[1:])))
+
     # --------------------------------------------------
     # Global option parser.  See mlhub.constants.OPTIONS
     # --------------------------------------------------
 
-    logger.info("Create global option parser.")
+    logger.debug("Create global option parser.")
     global_option_parser = argparse.ArgumentParser(
         add_help=False  # Disable -h or --help.  Use custom help msg instead.
     )
@@ -79,16 +103,17 @@ def main():
     # Parse version
     # --------------------------------------------------
 
-    logger.info("Parse global options.")
+    logger.debug("Parse global options.")
     args, extras = global_option_parser.parse_known_args(sys.argv[1:])
 
     if args.debug:  # Add console log handler to log debug message to console
-        logger.info('Enable printing out debug log on console.')
+        logger.debug('Enable printing out debug log on console.')
         utils.add_log_handler(
             logger,
             logging.StreamHandler(),
             logging.DEBUG,
             constants.LOG_CONSOLE_FORMAT)
+        logger.setLevel(logging.DEBUG)
 
     logger.debug('args: {}, extra_args: {}'.format(args, extras))
 
@@ -99,7 +124,7 @@ def main():
     logger.debug('First positional argument: {}'.format(first_pos_arg))
 
     if args.version:
-        logger.info('Query version.')
+        logger.debug('Query version.')
 
         # --------------------------------------------------
         # Query the version of the model, for example
@@ -120,9 +145,10 @@ def main():
     # Parse command line args for basic commands or model specific commands
     # --------------------------------------------------
 
-    # Correct misspelled command if possible.
+    # Correct misspelled command if possible.  Skip it for a basic command
+    # given exactly, which is what is mostly the case.
 
-    if first_pos_arg is not None:
+    if first_pos_arg is not None and utils.get_command_name(first_pos_arg) is None:
 
         # Only match basic commands since model pkg commands are more specific which would be
         # better to be checked after the model pkg name is known.
@@ -134,11 +160,11 @@ def main():
 
     # Dispatch commands.
 
-    if first_pos_arg is not None and first_pos_arg not in constants.COMMANDS:
+    if first_pos_arg is not None and utils.get_command_name(first_pos_arg) is None:
 
         # Model specific commands, such as demo, display.
 
-        logger.info("Parse model specific dommands.")
+        logger.debug("Parse model specific dommands.")
         model_cmd_parser = argparse.ArgumentParser(
             prog=constants.CMD,
             parents=[global_option_parser],
@@ -164,13 +190,21 @@ def main():
 
         # Basic commands, such as install, readme.  See mlhub.constants.COMMANDS
 
-        logger.info("Parse basic common commands.")
+        logger.debug("Parse basic common commands.")
         basic_cmd_parser = argparse.ArgumentParser(
             prog=constants.CMD,
             description="Access models from the ML Hub.",
             parents=[global_option_parser])
         subparsers = basic_cmd_parser.add_subparsers(title='subcommands', dest="cmd")
-        utils.SubCmdAdder(subparsers, commands, constants.COMMANDS).add_allsubcmds()
+        subcmd_adder = utils.SubCmdAdder(subparsers, commands, constants.COMMANDS)
+
+        # Only add the subcommand given, as the others are not needed to
+        # parse its arguments.  Add all of them for the usage of ml.
+
+        if first_pos_arg is None:
+            subcmd_adder.add_allsubcmds()
+        else:
+            subcmd_adder.add_subcmd(utils.get_command_name(first_pos_arg))
         args = basic_cmd_parser.parse_args()
         logger.debug("args: {}".format(args))
 
@@ -323,6 +357,29 @@ def main():
         msg = "Unknown file dependency type: {}\n"
         utils.print_error_exit(msg, e.args[0])
 
+    except utils.ModelPkgDependencyFileChecksumException as e:
+        msg = "File dependency does not match its checksum or size: {}\n"
+        utils.print_error_exit(msg, e.args[0])
+
+    except utils.ModelServerRunningException as e:
+        msg = "The model '{}' is already being served at:\n  {}"
+        utils.print_error_exit(msg, e.args[0], e.args[1])
+
+    except utils.ModelServerUnsupportedException as e:
+        msg = "The model '{}' cannot be served since {}."
+        utils.print_error_exit(msg, e.args[0], e.args[1])
+
+    except utils.BatchFailedException as e:
+        msg = "The command failed for {} of the {} inputs."
+        utils.print_error_exit(msg, e.args[0], e.args[1])
+
+    except utils.PromptUnavailableException as e:
+        msg = (
+            "Cannot ask, since stdin is the input of the batch:\n  {}?\n"
+            "Please give the inputs as arguments or with --input-file."
+        )
+        utils.print_error_exit(msg, e.args[0])
+
     except utils.ConfigureFailedException as e:  # configure failed, then just quit
         msg = "An error was encountered:\n{}\n"
         utils.print_error_exit(msg, e.args[0])
@@ -74,6 +74,7 @@ _mlhub() {
     local global_options    # list of available global options 
 
     local available_options
+    local batch_options
     local clean_options
     local installed_options
     local commands_options
@@ -81,6 +82,7 @@ _mlhub() {
     local install_options
     local readme_options
     local remove_options
+    local serve_options
 
     cur=${COMP_WORDS[COMP_CWORD]}      # current parameter
     prev=${COMP_WORDS[COMP_CWORD-1]}   # previous parameter
@@ -91,6 +93,7 @@ _mlhub() {
     # available global commands
     global_commands="\
     	available\
+	batch\
 	clean\
         installed\
 	commands\
@@ -98,6 +101,7 @@ _mlhub() {
 	install\
 	readme\
 	remove\
+	serve\
         "
 
     # available global options
@@ -115,6 +119,13 @@ _mlhub() {
     available_options="\
 	-h --help\
         --name-only\
+        --refresh\
+	"
+
+    batch_options="\
+	-h --help\
+        --input-file\
+        --jobs\
 	"
 
     clean_options="\
@@ -133,10 +144,14 @@ _mlhub() {
 
     configure_options="\
 	-h --help\
+        --jobs\
+        --connections\
 	"
 
     install_options="\
 	-h --help\
+        --refresh\
+        --connections\
 	"
 
     readme_options="\
@@ -147,6 +162,12 @@ _mlhub() {
 	-h --help\
 	"
 
+    serve_options="\
+	-h --help\
+        --preload\
+        --stop\
+	"
+
     # Determines possible completions for the command (${firstword})
     case "${firstword}" in
 	# Commands do not reqire a model name
@@ -156,6 +177,31 @@ _mlhub() {
 	clean)
 	    complete_options="${clean_options}"
 	    ;;
+	batch)
+	    complete_options="${batch_options}"
+
+	    # Complete the command, then the model, and then the inputs as
+	    # file names.  The values of the options are not counted.
+
+	    local i n=0
+	    for ((i = i_firstword + 1; i < COMP_CWORD; ++i)); do
+		if [[ ${COMP_WORDS[i]} == --input-file ]] ||
+		       [[ ${COMP_WORDS[i]} == --jobs ]]; then
+		    ((++i))
+		elif [[ ${COMP_WORDS[i]} != -* ]]; then
+		    ((++n))
+		fi
+	    done
+
+	    if [[ ${prev} == --input-file ]] || [[ ${prev} == --jobs ]]; then
+		:
+	    elif [[ ${n} == 0 ]]; then
+		complete_words=("$(_mlhub_cached_completion_words commands)")
+	    elif [[ ${n} == 1 ]]; then
+		local installed_models="$(_mlhub_get_model_list)"
+		complete_words=("${installed_models}")
+	    fi
+	    ;;
 	installed)
 	    complete_options="${installed_options}"
 	    ;;
@@ -203,6 +249,16 @@ _mlhub() {
 	    local installed_models="$(_mlhub_get_model_list)"
 	    complete_words=("${installed_models}")
 	    ;;
+	serve)
+	    complete_options="${serve_options}"
+
+	    # The module of --preload is not completed.
+
+	    if [[ ${prev} != --preload ]]; then
+		local installed_models="$(_mlhub_get_model_list)"
+		complete_words=("${installed_models}")
+	    fi
+	    ;;
 	*)
 	    if [[ ${COMP_CWORD} -le ${i_firstword} ]]; then
 
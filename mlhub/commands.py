@@ -28,7 +28,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import distro
+import concurrent.futures
 import glob
 import json
 import logging
@@ -40,15 +40,13 @@ import subprocess
 import sys
 import tempfile
 import textwrap
-import urllib.request
-import yaml
 
-from distutils.version import StrictVersion
 from mlhub.constants import (
     BASH_CMD,
     EXT_MLM,
     MLHUB_YAML,
     README,
+    STDERR_TAIL_BYTES,
 )
 
 # The commands are implemented here in a logical order with each
@@ -66,10 +64,11 @@ def list_available(args):
     # Setup.
 
     logger = logging.getLogger(__name__)
-    logger.info("List available models.")
+    logger.debug("List available models.")
     logger.debug("args: {}".format(args))
 
-    meta, repo = utils.get_repo_meta_data(args.mlhub)
+    index, repo = utils.get_repo_index(args.mlhub, args.refresh)
+    meta = index["entries"]
     model_names = [entry["meta"]["name"] for entry in meta]
 
     # Update bash completion list.
@@ -113,7 +112,7 @@ def list_installed(args):
     """List the installed models."""
 
     logger = logging.getLogger(__name__)
-    logger.info("List installed models.")
+    logger.debug("List installed models.")
 
     # Find installed models, ignoring special folders like R.
 
@@ -151,10 +150,16 @@ def list_installed(args):
     if mcnt > 0:
         print("")
 
+    index = utils.read_installed_index()
+    original_index = dict(index)
+    for name in set(index) - set(models):  # Removed by hand
+        del index[name]
+
     invalid_models = []
+    model_commands = set()
     for p in models:
         try:
-            entry = utils.load_description(p)
+            entry = utils.load_installed_description(p, index)
             utils.print_meta_line(entry)
         except (
             utils.DescriptionYAMLNotFoundException,
@@ -165,10 +170,16 @@ def list_installed(args):
             invalid_models.append(p)
             continue
 
-        # Update bash completion list.
-
         if "commands" in entry:
-            utils.update_command_completion(set(entry["commands"]))
+            model_commands.update(entry["commands"])
+
+    # Update bash completion list.
+
+    if model_commands:
+        utils.update_command_completion(model_commands)
+
+    if index != original_index:
+        utils.write_installed_index(index)
 
     invalid_mcnt = len(invalid_models)
     if invalid_mcnt > 0:
@@ -206,6 +217,8 @@ def install_model(args):
                           like mlhubber/audit:doc/MLHUB.yaml.
     """
 
+    from distutils.version import StrictVersion
+
     logger = logging.getLogger(__name__)
     logger.info("Install a model.")
     logger.debug("args: {}".format(args))
@@ -217,6 +230,7 @@ def install_model(args):
     mlhubyaml = None  # MLHUB.yaml path or URL
     repo_obj = None  # RepoTypeURL object for related URL interpretation
     maybe_private = False  # Maybe private repo
+    response = None  # Response to the package URL, opened for its file name
 
     # Obtain the model URL if not a local file.
 
@@ -242,7 +256,7 @@ def install_model(args):
         # Get model pkg meta data from mlhub repo.
 
         location, version, meta_list = utils.get_model_info_from_repo(
-            model, args.mlhub
+            model, args.mlhub, args.refresh
         )
 
         # Update bash completion list.
@@ -269,6 +283,7 @@ def install_model(args):
         #   $ ml install https://bitbucket.org/mlhubber/audit/...        # BitBucket repo
 
         repo_obj = utils.RepoTypeURL.get_repo_obj(location)
+        repo_obj.pin_ref()
         try:
             mlhubyaml = repo_obj.get_pkg_yaml_url()
             location = repo_obj.compose_repo_zip_url()
@@ -285,13 +300,19 @@ def install_model(args):
         pkgfile = repo_obj.repo
     elif utils.is_archive_file(location):
         pkgfile = os.path.basename(location)  # pkg file name
+    elif repo_obj:
+        pkgfile = repo_obj.get_repo_zip_filename()
     elif utils.is_url(location):
-        pkgfile = utils.get_url_filename(location)
+        response = utils.urlopen(location)
+        pkgfile = utils.get_response_filename(response, location)
 
     # Query archive type if not available from file name per se.
 
     if not maybe_private:
         while pkgfile is None or not utils.is_archive_file(pkgfile):
+            if response is not None:
+                response.close()
+                response = None
             print(
                 "The file type cannot be determined.\n"
                 "Please give it a file name with explicit valid archive extension: ",
@@ -335,41 +356,49 @@ def install_model(args):
 
                 # Get MLHUB.yaml inside the archive file.
 
-                if utils.is_url(
-                    location
-                ):  # Download the package file because it is not from GitHub.
-                    utils.download_model_pkg(
-                        location, local, pkgfile, args.quiet
+                connections = args.connections or utils.get_download_connections(
+                    model
+                )
+                if utils.is_url(location) and utils.can_stream_model_pkg(
+                    location, pkgfile, connections
+                ):  # Extract the tarball while downloading it.
+                    utils.stream_model_pkg(
+                        location, uncompressdir, pkgfile, args.quiet, response
                     )
 
-                if not args.quiet:
-                    print("Extracting '{}' ...\n".format(pkgfile))
-
-                utils.unpack_with_promote(
-                    local, uncompressdir, valid_name=pkgfile
-                )
+                else:
+                    if utils.is_url(
+                        location
+                    ):  # Download the package file because it is not from GitHub.
+                        utils.download_model_pkg(
+                            location,
+                            local,
+                            pkgfile,
+                            args.quiet,
+                            connections,
+                            response,
+                        )
+
+                    if not args.quiet:
+                        print("Extracting '{}' ...\n".format(pkgfile))
+
+                    utils.unpack_with_promote(
+                        local, uncompressdir, valid_name=pkgfile
+                    )
                 mlhubyaml = utils.get_available_pkgyaml(
                     uncompressdir
                 )  # Path to MLHUB.yaml
 
             elif maybe_private:
 
-                identity_env = (
-                    "GIT_SSH_COMMAND='ssh -i {}' ".format(key) if key else ""
-                )
-                command = "cd {}; {}git clone {}; cd {}; git checkout {}".format(
-                    mlhubtmpdir,
-                    identity_env,
+                errors = utils.clone_repo(
                     repo_obj.get_ssh_clone_url(),
-                    repo_obj.repo,
                     repo_obj.ref,
+                    os.path.join(mlhubtmpdir, repo_obj.repo),
+                    key,
                 )
-                proc = subprocess.Popen(
-                    command, shell=True, stderr=subprocess.PIPE
-                )
-                output, errors = proc.communicate()
-                if proc.returncode != 0:
-                    raise utils.InstallFailedException(errors.decode("utf-8"))
+                if errors is not None:
+                    raise utils.InstallFailedException(errors)
 
                 if repo_obj.path:
                     mlhubyaml = os.path.join(uncompressdir, repo_obj.path)
@@ -388,6 +417,12 @@ def install_model(args):
                 {model}
             )  # Update bash completion list.
 
+        # The response is not kept open while asking about the version.
+
+        if response is not None:
+            response.close()
+            response = None
+
         # Check if model is already installed.
 
         install_path = utils.get_package_dir(model)  # Installation path
@@ -440,13 +475,30 @@ def install_model(args):
         if not os.path.exists(
             uncompressdir
         ):  # Model pkg mlm or GitHub pkg has not unzipped yet.
-            if utils.is_url(location):  # Download the package file if needed.
-                utils.download_model_pkg(location, local, pkgfile, args.quiet)
+            connections = args.connections or utils.get_download_connections(
+                model
+            )
+            if utils.is_url(location) and utils.can_stream_model_pkg(
+                location, pkgfile, connections
+            ):  # Extract the tarball while downloading it.
+                utils.stream_model_pkg(
+                    location, uncompressdir, pkgfile, args.quiet
+                )
 
-            if not args.quiet:
-                print("Extracting '{}' ...\n".format(pkgfile))
+            else:
+                if utils.is_url(
+                    location
+                ):  # Download the package file if needed.
+                    utils.download_model_pkg(
+                        location, local, pkgfile, args.quiet, connections
+                    )
+
+                if not args.quiet:
+                    print("Extracting '{}' ...\n".format(pkgfile))
 
-            utils.unpack_with_promote(local, uncompressdir, valid_name=pkgfile)
+                utils.unpack_with_promote(
+                    local, uncompressdir, valid_name=pkgfile
+                )
 
         # Install package files.
         #
@@ -484,17 +536,14 @@ def install_model(args):
             if utils.is_url(
                 mlhubyaml
             ):  # We currently only support MLHUB.yaml specified on GitHub.
-                if mlhubyaml.startswith("https://api"):
-                    urllib.request.urlretrieve(
-                        json.loads(urllib.request.urlopen(mlhubyaml).read())[
-                            "download_url"
-                        ],
-                        os.path.join(install_path, MLHUB_YAML),
-                    )
-                else:
-                    urllib.request.urlretrieve(
-                        mlhubyaml, os.path.join(install_path, MLHUB_YAML)
-                    )
+                yaml_url = mlhubyaml
+                if yaml_url.startswith("https://api"):
+                    yaml_url = json.loads(utils.read_url(yaml_url))[
+                        "download_url"
+                    ]
+                yaml_file = os.path.join(install_path, MLHUB_YAML)
+                with open(yaml_file, "wb") as file:
+                    file.write(utils.read_url(yaml_url))
             else:
                 shutil.move(mlhubyaml, install_path)
 
@@ -519,10 +568,11 @@ def install_model(args):
             # Otherwise, <unzipdir> will be inside <install_path>
             shutil.move(uncompressdir, install_path)
 
-        # Update bash completion list.
+        # Update the index of installed models and bash completion list.
 
+        utils.clear_description_cache()
         utils.update_command_completion(
-            set(utils.load_description(model)["commands"])
+            set(utils.update_installed_index(model)["commands"])
         )
 
         # Update working dir if any.
@@ -587,7 +637,7 @@ def readme(args):
     # Setup.
 
     logger = logging.getLogger(__name__)
-    logger.info("Get README of {}.".format(model))
+    logger.debug("Get README of {}.".format(model))
 
     path = utils.get_package_dir(model)
     readme_file = os.path.join(path, README)
@@ -610,10 +660,8 @@ def readme(args):
         script = os.path.join(
             os.path.dirname(__file__), "scripts", "convert_readme.sh"
         )
-        command = "{} {} {} {}".format(BASH_CMD, script, readme_raw, README)
-        proc = subprocess.Popen(
-            command, shell=True, cwd=path, stderr=subprocess.PIPE
-        )
+        command = [BASH_CMD, script, readme_raw, README]
+        proc = utils.popen(command, cwd=path, stderr=subprocess.PIPE)
         output, errors = proc.communicate()
         if proc.returncode != 0:
             errors = errors.decode("utf-8")
@@ -666,7 +714,7 @@ def list_model_commands(args):
         model = matched_model
 
     logger = logging.getLogger(__name__)
-    logger.info("List available commands of '{}'".format(model))
+    logger.debug("List available commands of '{}'".format(model))
 
     # Check that the model is installed.
 
@@ -713,6 +761,9 @@ def list_model_commands(args):
 def configure_model(args):
     """Ensure the user's environment is configured."""
 
+    import distro
+    import yaml
+
     # TODO: Add support for additional configuration if any except those
     #       specified in MLHUB.yaml.
     # TODO: When fail, print out the failed dep, as well as installed
@@ -759,12 +810,10 @@ def configure_model(args):
 
         if distro.id() in ["debian", "ubuntu"]:
             path = os.path.dirname(__file__)
-            env_var = "export _MLHUB_OPTION_YES='y'; " if YES else ""
-            env_var += 'export _MLHUB_PYTHON_EXE="{}"; '.format(sys.executable)
+            env = utils.get_dep_script_env(YES)
             script = os.path.join("scripts", "dep", "mlhub.sh")
-            command = "{}{} {}".format(env_var, BASH_CMD, script)
-            proc = subprocess.Popen(
-                command, shell=True, cwd=path, stderr=subprocess.PIPE
+            proc = utils.popen(
+                [BASH_CMD, script], env=env, cwd=path, stderr=subprocess.PIPE
             )
             output, errors = proc.communicate()
             if proc.returncode != 0:
@@ -874,7 +923,15 @@ def configure_model(args):
             # ----- Files -----
 
             elif "files".startswith(category):
-                utils.install_file_deps(deplist, model, key=args.i, yes=YES)
+                utils.install_file_deps(
+                    deplist,
+                    model,
+                    key=args.i,
+                    yes=YES,
+                    jobs=args.jobs,
+                    connections=args.connections
+                    or utils.get_download_connections(model),
+                )
 
     # Run additional configure script if any.
 
@@ -909,15 +966,22 @@ def configure_model(args):
 # ------------------------------------------------------------------------
 
 
-def dispatch(args):
-    """Dispatch other commands to the appropriate model provided script."""
+def prepare_dispatch(args):
+    """Check that the command of the model in args can be run and return
+how to run its script.
+
+    The returned dict has the description of the model as 'entry', the
+    command as corrected as 'cmd', the dir to run the script in as
+    'path', the command line to run it, but for its parameters, as
+    'argv' and the environment variables to add for it as 'env'.  If
+    the script can be run on the server of the model, 'script' is its
+    path, else None.
+    """
 
     cmd = args.cmd
     model = args.model
     path = utils.get_package_dir(model)
 
-    param = " ".join(args.param)
-
     # Get working dir if any.
 
     if args.working_dir is not None:
@@ -993,7 +1057,7 @@ or else connect to the server's desktop using a local X server like X2Go.
     #
     # .R => Rscript; .py => python, etc.
 
-    interpreter = utils.interpreter(script)
+    interpreter, env = utils.interpreter(script)
 
     # Change working dir if needed
 
@@ -1009,36 +1073,105 @@ or else connect to the server's desktop using a local X server like X2Go.
     # as utils.get_cmd_cwd().  And model package developer should be
     # use the helper function instead of the env vars directly.
 
-    env_var = "export _MLHUB_CMD_CWD='{}'; ".format(os.getcwd())
-    env_var += "export _MLHUB_MODEL_NAME='{}'; ".format(model)
-    env_var += (
-        'export _MLHUB_PYTHON_EXE="{}"; '.format(sys.executable)
-        if not conda_env_name
-        else ""
-    )
-    if not conda_env_name and script.endswith(
-        "py"
-    ):  # Handle python environment
-        env_var += utils.get_py_pkg_path_env(model)
-
-    command = "{}{} {} {}".format(
-        env_var, interpreter if not conda_env_name else "python", script, param
-    )
+    env["_MLHUB_CMD_CWD"] = os.getcwd()
+    env["_MLHUB_MODEL_NAME"] = model
 
-    # Run script inside conda environment if specified
+    # Run script inside conda environment if specified, directly by its
+    # python if it needs no activation, or else through bash.
 
     if conda_env_name is not None:
-        command = '{} -ic "conda activate {}; {}"'.format(
-            BASH_CMD, conda_env_name, command
-        )
+        prefix = utils.get_conda_env_prefix(conda_env_name)
+        if prefix is not None:
+            bindir = os.path.join(prefix, "bin")
+            interpreter = [os.path.join(bindir, "python")]
+            env["PATH"] = bindir + os.pathsep + os.environ.get("PATH", "")
+            env["CONDA_PREFIX"] = prefix
+            env["CONDA_DEFAULT_ENV"] = conda_env_name
+        else:
+            activate = 'conda activate {}; exec python "$@"'
+            interpreter = [
+                BASH_CMD,
+                "-ic",
+                activate.format(conda_env_name),
+                BASH_CMD,
+            ]
+    else:
+        env["_MLHUB_PYTHON_EXE"] = sys.executable
+        if script.endswith("py"):  # Handle python environment
+            env.update(utils.get_py_pkg_path_env(model))
+
+    # A Python script is run on the server of the model if `ml serve` is
+    # running for it, rather than in a new interpreter.
+
+    served = None
+    if (
+        not conda_env_name
+        and script.endswith("py")
+        and os.path.exists(utils.get_server_socket_path(model))
+    ):
+        served = os.path.join(utils.get_package_dir(model), cmd + ".py")
+
+    return {
+        "entry": entry,
+        "cmd": cmd,
+        "path": path,
+        "argv": interpreter + [script],
+        "env": env,
+        "script": served,
+    }
+
+
+def dispatch(args):
+    """Dispatch other commands to the appropriate model provided script."""
+
+    logger = logging.getLogger(__name__)
 
-    logger.debug("(cd " + path + "; " + command + ")")
+    run = prepare_dispatch(args)
+    cmd = run["cmd"]
+    model = args.model
+    path = run["path"]
+
+    # The stderr of the script is shown as it comes, and its tail is kept
+    # to diagnose the errors.
+
+    sys.stderr.flush()
+    returncode = None
+    if run["script"] is not None:
+        rfd, wfd = os.pipe()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as tee:
+            tail = tee.submit(
+                utils.tee_stream, rfd, sys.stderr.buffer, STDERR_TAIL_BYTES
+            )
+            try:
+                returncode = utils.run_on_model_server(
+                    model,
+                    run["script"],
+                    args.param,
+                    path,
+                    dict(os.environ, **run["env"]),
+                    fds=(0, 1, wfd),
+                )
+            finally:
+                os.close(wfd)
+            errors = tail.result()
+        os.close(rfd)
+
+    if returncode is None:
+        command = run["argv"] + args.param
+        logger.debug("(cd {}; {})".format(path, " ".join(command)))
+
+        proc = utils.popen(
+            command, env=run["env"], cwd=path, stderr=subprocess.PIPE
+        )
+        with proc.stderr:
+            errors = utils.tee_stream(
+                proc.stderr.fileno(), sys.stderr.buffer, STDERR_TAIL_BYTES
+            )
+        returncode = proc.wait()
 
-    proc = subprocess.Popen(command, shell=True, cwd=path)
-    output, errors = proc.communicate()
     missing_r_dep = False
-    if proc.returncode != 0:
-        errors = errors.decode("utf-8")
+    if returncode != 0:
+        errors = errors.decode("utf-8", errors="replace")
 
         # Check if it is Python dependency unsatisfied
 
@@ -1071,16 +1204,167 @@ or else connect to the server's desktop using a local X server like X2Go.
             )
         elif data_required is not None:  # Data not found
             raise utils.DataResourceNotFoundException()
-        else:  # Other unknown errors
-            print("An error was encountered:\n")
-            print(errors)
+        else:  # Other errors, already shown on stderr by tee_stream().
+
+            # Exit with the code of the script, or as a shell does when
+            # it is killed by a signal.
+
+            sys.exit(returncode if returncode > 0 else 128 - returncode)
 
     else:
         # Suggest next step - in the context of the command line view
         # of the tool, let's not provide a next step for now. 20190528
 
         if False:  # not args.quiet:
-            utils.print_next_step(cmd, description=entry, model=model)
+            utils.print_next_step(cmd, description=run["entry"], model=model)
+
+
+# ------------------------------------------------------------------------
+# BATCH
+# ------------------------------------------------------------------------
+
+
+def batch(args):
+    """Run a command of a model over many inputs."""
+
+    # Prepare before the inputs are read, since it may prompt, but never
+    # read the answer from stdin when it is the input.
+
+    from_stdin = args.input_file == "-" or (
+        not args.inputs and not args.input_file
+    )
+    if from_stdin and not sys.stdin.isatty():
+        utils.disable_prompts()
+
+    run = prepare_dispatch(args)
+
+    # Collect the inputs, from stdin if none is given.
+
+    lines = None
+    if from_stdin:
+        lines = sys.stdin.read().splitlines()
+    elif args.input_file is not None:
+        with open(args.input_file, "r") as file:
+            lines = file.read().splitlines()
+
+    inputs = [line.strip() for line in lines or [] if line.strip()]
+    for name in args.inputs:
+        inputs.extend(sorted(glob.glob(os.path.expanduser(name))) or [name])
+
+    # Run the inputs in a pool, but output their results in order.
+
+    failed = 0
+    jobs = max(args.jobs, 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(run_batch_input, run, args.model, name)
+            for name in inputs
+        ]
+        try:
+            for future in futures:
+                returncode, output, errors = future.result()
+                results = ((sys.stdout, output), (sys.stderr, errors))
+                for stream, data in results:
+                    stream.flush()
+                    stream.buffer.write(data)
+                    stream.flush()
+                if returncode != 0:
+                    failed += 1
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+
+    if failed:
+        raise utils.BatchFailedException(failed, len(inputs))
+
+
+def run_batch_input(run, model, name):
+    """Run the script of <run> of <model> on the input <name> and return
+its exit code, output and errors."""
+
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        returncode = None
+        if run["script"] is not None:
+            with open(os.devnull, "rb") as null:
+                returncode = utils.run_on_model_server(
+                    model,
+                    run["script"],
+                    [name],
+                    run["path"],
+                    dict(os.environ, **run["env"]),
+                    fds=(null.fileno(), out.fileno(), err.fileno()),
+                )
+
+        if returncode is None:
+            returncode = utils.popen(
+                run["argv"] + [name],
+                env=run["env"],
+                cwd=run["path"],
+                stdin=subprocess.DEVNULL,
+                stdout=out,
+                stderr=err,
+            ).wait()
+
+        out.seek(0)
+        err.seek(0)
+        return returncode, out.read(), err.read()
+
+
+# ------------------------------------------------------------------------
+# SERVE
+# ------------------------------------------------------------------------
+
+
+def serve_model(args):
+    """Keep a model loaded to run its Python commands faster."""
+
+    model = args.model
+
+    if args.stop:
+        if not utils.stop_model_server(model):
+            print("No server of the model '{}' is running.".format(model))
+        return
+
+    utils.check_model_installed(model)
+
+    sock = utils.connect_model_server(model)
+    if sock is not None:
+        sock.close()
+        raise utils.ModelServerRunningException(
+            model, utils.get_server_socket_path(model)
+        )
+
+    if utils.get_conda_env_name(model):
+        raise utils.ModelServerUnsupportedException(
+            model, "it runs in a conda environment"
+        )
+
+    entry = utils.load_description(model)
+    path = utils.get_package_dir(model)
+    if not any(
+        os.path.exists(os.path.join(path, cmd + ".py"))
+        for cmd in entry.get("commands", [])
+    ):
+        raise utils.ModelServerUnsupportedException(
+            model, "it has no Python commands"
+        )
+
+    # Modules to import once may also be listed in the description.
+
+    preload = args.preload + list(entry["meta"].get("preload", []))
+    paths = [path, utils.get_py_pkg_paths(model)[1]]
+
+    if not args.quiet:
+        msg = (
+            "Serving the model '{}' at {}\n\n"
+            "Its Python commands now run on this server. "
+            "To stop it, press Ctrl-C or run:\n\n"
+            "  $ ml serve --stop {}\n"
+        )
+        print(msg.format(model, utils.get_server_socket_path(model), model))
+
+    utils.serve_model(model, paths, preload)
 
 
 # ------------------------------------------------------------------------
@@ -1102,7 +1386,8 @@ def donate(args):
 
 
 def remove_mlm(args):
-    """Remove downloaded {} files.""".format(EXT_MLM)
+    """Remove downloaded {} files, stale cached meta data and partial
+downloads.""".format(EXT_MLM)
 
     mlm = glob.glob(os.path.join(utils.get_init_dir(), "*.mlm"))
     mlm.sort()
@@ -1110,6 +1395,18 @@ def remove_mlm(args):
         if utils.yes_or_no("Remove model package archive '{}'", m, yes=True):
             os.remove(m)
 
+    # The cached copies of the repository index and of the responses of
+    # the APIs of the repo hosting services, and the partial downloads
+    # never resumed, are otherwise kept for good.
+
+    removed = utils.prune_url_cache()
+    if removed:
+        print("Removed {} stale cached copies of meta data.".format(removed))
+
+    removed = utils.prune_partial_downloads()
+    if removed:
+        print("Removed {} stale partial downloads.".format(removed))
+
 
 # ------------------------------------------------------------------------
 # REMOVE
@@ -1154,9 +1451,20 @@ def remove_model(args):
 
     if utils.yes_or_no(msg, path, yes=True):
 
+        # Stop the servers of the models removed, if any, before removing
+        # their sockets.
+
+        if model is None:
+            utils.stop_model_servers()
+        else:
+            utils.stop_model_server(model)
+
         # Remove package installation dir
 
         shutil.rmtree(path)
+        utils.clear_description_cache()
+        if model is not None:
+            utils.update_installed_index(model, remove=True)
 
         # Remove package config dir as well without ask
 
@@ -1173,6 +1481,7 @@ def remove_model(args):
             archive = utils.get_package_archive_dir(model)
             if os.path.exists(archive):
                 shutil.rmtree(archive)
+            utils.remove_unused_blobs()
     else:
         if model is None and not args.quiet:
             utils.print_next_step("remove")
@@ -74,6 +74,75 @@ ARCHIVE_DIR = os.path.join(MLINIT, ".archive")
 CONFIG_DIR = os.path.join(MLINIT, ".config")
 CONFIG_FILE = "config.yaml"
 
+# Index of the installed models in MLINIT, with the meta data of each
+# listed by `ml installed`, so that their YAML files need not be parsed.
+
+INSTALLED_INDEX = ".installed.json"
+
+# Checksums of the files downloaded for a model, in its archive dir.
+
+FILE_MANIFEST = ".manifest.json"
+
+# Partial downloads of model packages, kept for resuming the download.
+# Those of file dependencies are kept next to the file they download
+# into, in the archive dir of the model if it is unpacked, else in its
+# cache dir.  `ml clean` removes all of them once untouched for
+# PARTIAL_MAX_AGE seconds, or MLHUB_PARTIAL_MAX_AGE if set.
+
+PARTIAL_DIR = os.path.join(ARCHIVE_DIR, ".partial")
+PARTIAL_MAX_AGE = 7 * 24 * 3600
+
+# Store of downloaded files shared by all models.  Each file is kept
+# once as a blob named by its SHA-256 checksum, to which the archive and
+# cache files of models are hard linked.
+
+STORE_DIR = os.path.join(MLINIT, ".store")
+
+# Unix sockets of the model servers started by `ml serve`.
+
+SERVER_DIR = os.path.join(MLINIT, ".run")
+
+# Local copy of the ML Hub repository index (Packages.yaml).  The copy is
+# used as is for META_CACHE_TTL seconds, or MLHUB_CACHE_TTL if set, after
+# it was fetched, and then
+# revalidated against the ML Hub with a conditional GET.  The responses of
+# the APIs of GitHub, GitLab and Bitbucket are cached here as well.
+
+META_CACHE_DIR = os.path.join(CACHE_DIR, ".meta")
+META_CACHE_TTL = 3600
+
+# `ml clean` removes the cached copies not fetched or revalidated within
+# META_CACHE_MAX_AGE seconds.  So does caching a URL anew, which also
+# removes the oldest copies beyond META_CACHE_MAX_ENTRIES.  This includes
+# the copies of content at a commit SHA, which are used without expiry.
+# MLHUB_CACHE_MAX_AGE and MLHUB_CACHE_MAX_ENTRIES override them if set.
+
+META_CACHE_MAX_AGE = 30 * 24 * 3600
+META_CACHE_MAX_ENTRIES = 1000
+
+# Description YAML files found missing in remote package repos, so that
+# they are not looked for again within META_CACHE_TTL seconds.
+
+PKGYAML_MISS_FILE = os.path.join(META_CACHE_DIR, "missing.json")
+
+# Commit SHAs the refs (branches or tags) of remote package repos were
+# resolved to, which are resolved again after REF_CACHE_TTL seconds, or
+# MLHUB_REF_TTL if set.
+
+REF_CACHE_FILE = os.path.join(META_CACHE_DIR, "refs.json")
+REF_CACHE_TTL = 300
+
+# HTTP client shared by all the requests of a process, which keeps up to
+# HTTP_POOL_SIZE connections alive per host, or as many as the downloads
+# run at the same time if more.  HTTP_TIMEOUT is in seconds, to connect
+# and then between reads, or MLHUB_HTTP_TIMEOUT if set.  The User-Agent
+# is a browser's, since some sites refuse a library as a robot with 403
+# Forbidden.
+
+HTTP_TIMEOUT = 60
+HTTP_POOL_SIZE = 16
+HTTP_USER_AGENT = "Mozilla/5.0"
+
 # ------------------------------------------------------------------------
 # Application information.
 # ------------------------------------------------------------------------
@@ -87,6 +156,11 @@ EXT_AIPK = ".aipk"  # Backward compatibility
 
 VERSION = "3.5.13"  # DO NOT MODIFY. Managed from ../Makefile.
 
+DOWNLOAD_JOBS = 4  # Number of files downloaded at the same time.
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024  # Smallest segment of a large file.
+STREAM_RESUME_MIN_SIZE = 256 * 1024 * 1024  # Smallest resumable stream.
+STDERR_TAIL_BYTES = 64 * 1024  # stderr of a model command kept to diagnose.
+
 OPTIONS = {
     # Global command line options
     #
@@ -144,6 +218,10 @@ COMMANDS = {
                 "help": "list only the names",
                 "action": "store_true",
             },
+            "--refresh": {
+                "help": "revalidate the cached repository index",
+                "action": "store_true",
+            },
         },
         "alias": ["avail"],
         "usage": "  available            list the models available from the ML Hub repository",
@@ -166,14 +244,26 @@ COMMANDS = {
         },
     },
     "clean": {
-        "description": "remove downloaded model package files",
-        "usage": "  clean                remove downloaded model package files",
+        "description": "remove downloaded model package files and stale caches",
+        "usage": "  clean                remove downloaded model package files and stale caches",
         "confirm": "remove model package archive '{}' [Y/n]? ",
         "func": "remove_mlm",
     },
     "install": {
         "description": "install a named model, local model file or URL",
-        "argument": {"model": {}, "-i": {"help": "SSH key path"}},
+        "argument": {
+            "model": {},
+            "-i": {"help": "SSH key path"},
+            "--refresh": {
+                "help": "revalidate the cached repository index",
+                "action": "store_true",
+            },
+            "--connections": {
+                "type": int,
+                "metavar": "N",
+                "help": "download a large file over up to N connections",
+            },
+        },
         "usage": "  install    <model>   install a named model, local model file or URL",
         "func": "install_model",
         "next": ["configure"],
@@ -215,11 +305,64 @@ COMMANDS = {
                 "help": 'assume "yes" as answer to all prompts',
             },
             "-i": {"help": "SSH key path"},
+            "--jobs": {
+                "type": int,
+                "default": DOWNLOAD_JOBS,
+                "metavar": "N",
+                "help": "download up to N files at the same time",
+            },
+            "--connections": {
+                "type": int,
+                "metavar": "N",
+                "help": "download a large file over up to N connections",
+            },
         },
         "usage": "  configure [<model>]  configure ml or the model's dependencies",
         "func": "configure_model",
         "next": ["readme"],
     },
+    "batch": {
+        "description": "run a command of a model over many inputs",
+        "argument": {
+            "cmd": {"metavar": "command"},
+            "model": {},
+            "inputs": {
+                "nargs": "*",
+                "metavar": "input",
+                "help": "an input or a glob of inputs",
+            },
+            "--input-file": {
+                "metavar": "FILE",
+                "help": "read inputs from FILE, one per line, or stdin if -",
+            },
+            "--jobs": {
+                "type": int,
+                "default": 1,
+                "metavar": "N",
+                "help": "run up to N inputs at the same time",
+            },
+        },
+        "usage": "  batch <command> <model> <input>...  run a command of a model over many inputs",
+        "func": "batch",
+    },
+    "serve": {
+        "description": "keep a model loaded to run its Python commands faster",
+        "argument": {
+            "model": {},
+            "--preload": {
+                "action": "append",
+                "default": [],
+                "metavar": "MODULE",
+                "help": "import MODULE once in the server (repeatable)",
+            },
+            "--stop": {
+                "action": "store_true",
+                "help": "stop the server of the model",
+            },
+        },
+        "usage": "  serve      <model>   keep a model loaded to run its Python commands faster",
+        "func": "serve_model",
+    },
     "remove": {
         "description": "remove a model or remove all models",
         "argument": {"model": {"nargs": "?"}},
@@ -310,7 +453,17 @@ META_YML = "Packages.yml"
 # Debugging
 # ------------------------------------------------------------------------
 
-LOG_FILE_LEVEL = logging.DEBUG
+# The log file is rotated once it reaches LOG_FILE_MAX_BYTES, keeping
+# LOG_FILE_BACKUP_COUNT old ones as mlhub.log.1, mlhub.log.2, ...  They
+# are overridden by MLHUB_LOG_MAX_BYTES and MLHUB_LOG_BACKUP_COUNT if
+# set.  An unknown MLHUB_LOG_LEVEL falls back to LOG_FILE_DEFAULT_LEVEL.
+
+LOG_FILE_DEFAULT_LEVEL = logging.INFO
+LOG_FILE_LEVEL = LOG_FILE_DEFAULT_LEVEL
+if "MLHUB_LOG_LEVEL" in os.environ:
+    LOG_FILE_LEVEL = os.getenv("MLHUB_LOG_LEVEL").upper()
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 3
 LOG_FILE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s: %(message)s"
 LOG_CONSOLE_FORMAT = "--> %(name)s - %(levelname)s: %(message)s"
 LOG_NOT_QUIET = {"quiet": False}
@@ -327,6 +480,7 @@ PIP_PATH = "pip_path"  # pip path, such as /usr/bin/pip3
 SYS_PYTHON_PKG_USAGE = (
     "sys_python_pkg_usage"  # Whether system python packages installed
 )
+CONNECTIONS = "connections"  # Connections to download a large file
 
 
 # ------------------------------------------------------------------------
@@ -28,31 +28,40 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import array
 import base64
-import cgi
 import collections
-import distro
+import concurrent.futures
+import copy
+import email.message
+import fcntl
+import functools
+import hashlib
+import http.client
+import importlib
 import json
 import logging
+import logging.handlers
 import os
+import pickle
 import re
+import runpy
+import selectors
 import shutil
+import signal
 import site
+import socket
 import subprocess
 import sys
-import tarfile
 import tempfile
+import threading
+import time
+import traceback
 import urllib.error
 import urllib.parse
-import urllib.request
 import uuid
-import yaml
-import yamlordereddictloader
-import zipfile
 
 from abc import ABC, abstractmethod
-from rapidfuzz import fuzz
-from rapidfuzz import process as fuzzprocess
 from mlhub.constants import (
     APP,
     APPX,
@@ -67,18 +76,38 @@ from mlhub.constants import (
     CONDA_ENV_NAME,
     CONFIG_DIR,
     CONFIG_FILE,
+    CONNECTIONS,
     DESC_YAML,
     DESC_YML,
+    DOWNLOAD_JOBS,
+    FILE_MANIFEST,
+    INSTALLED_INDEX,
     EXT_AIPK,
     EXT_MLM,
+    HTTP_POOL_SIZE,
+    HTTP_TIMEOUT,
+    HTTP_USER_AGENT,
     LOG_DIR,
+    META_CACHE_DIR,
+    META_CACHE_MAX_AGE,
+    META_CACHE_MAX_ENTRIES,
+    META_CACHE_TTL,
     META_YAML,
     META_YML,
     MLHUB,
     MLHUB_YAML,
     MLINIT,
     MSG_INCOMPATIBLE_PYTHON_ENV,
+    PARTIAL_DIR,
+    PARTIAL_MAX_AGE,
+    PKGYAML_MISS_FILE,
+    REF_CACHE_FILE,
+    REF_CACHE_TTL,
     RSCRIPT_CMD,
+    SEGMENT_MIN_SIZE,
+    STREAM_RESUME_MIN_SIZE,
+    SERVER_DIR,
+    STORE_DIR,
     SYS_PYTHON_CMD,
     SYS_PYTHON_PKG_USAGE,
     USAGE,
@@ -86,6 +115,83 @@ from mlhub.constants import (
     WORKING_DIR,
 )
 
+# In-process caches of the description YAML file found in a local package
+# dir, of the description loaded from a local YAML file keyed by its path
+# and modification time, and of the remote raw files read keyed by their
+# URL.  See clear_description_cache().
+
+_pkgyaml_cache = {}
+_description_cache = {}
+_raw_file_cache = {}
+
+# In-process cache of the config of models, keyed by the path of the
+# config file.  See load_config().
+
+_config_cache = {}
+
+# HTTP session shared by all the requests of the process.  See
+# get_http_session().
+
+_http_session = None
+_http_pool_size = 0
+
+# Whether yes_or_no() may read the answer from stdin, which it may not
+# when stdin is the input of `ml batch`.  See disable_prompts().
+
+_prompts_enabled = True
+
+# File dependencies are downloaded at the same time, but unpacked one at
+# a time, since they may unpack into the same dirs, and zipfile and
+# tarfile fail when creating the same dir at the same time.  See
+# download_file_dep().
+
+_unpack_lock = threading.Lock()
+
+# The umask of the process, which can only be read by setting it, so it is
+# read once at import.  See write_atomically().
+
+_umask = os.umask(0o022)
+os.umask(_umask)
+
+
+def get_env_number(name, default, convert=int):
+    """Return the value of the environment variable <name> converted by
+<convert>, or <default> if unset.  An invalid or negative value is warned
+about and <default> is kept, rather than failing every command."""
+
+    if name not in os.environ:
+        return default
+
+    value = os.getenv(name)
+    try:
+        number = convert(value)
+        if number >= 0:
+            return number
+    except ValueError:
+        pass
+
+    print(
+        "Warning: invalid value '{}' of {}, using {}.".format(
+            value, name, default
+        ),
+        file=sys.stderr,
+    )
+
+    return default
+
+
+# The settings which environment variables override, read once here since
+# they are the defaults of the functions below.  See constants.py.
+
+PARTIAL_MAX_AGE = get_env_number("MLHUB_PARTIAL_MAX_AGE", PARTIAL_MAX_AGE)
+META_CACHE_TTL = get_env_number("MLHUB_CACHE_TTL", META_CACHE_TTL)
+META_CACHE_MAX_AGE = get_env_number("MLHUB_CACHE_MAX_AGE", META_CACHE_MAX_AGE)
+META_CACHE_MAX_ENTRIES = get_env_number(
+    "MLHUB_CACHE_MAX_ENTRIES", META_CACHE_MAX_ENTRIES
+)
+REF_CACHE_TTL = get_env_number("MLHUB_REF_TTL", REF_CACHE_TTL)
+HTTP_TIMEOUT = get_env_number("MLHUB_HTTP_TIMEOUT", HTTP_TIMEOUT, float)
+
 
 # ----------------------------------------------------------------------
 # MLHUB repo and model package
@@ -105,32 +211,248 @@ def get_repo(mlhub):
     return repo
 
 
-def get_repo_meta_data(repo):
-    """Read the repositories meta data file and return as a list."""
+def get_repo_index(repo, refresh=False):
+    """Return the compiled index of the repositories meta data file.
+
+    The meta data file is read through the local cache, see
+    read_cached_url().  If <refresh> is True, the cached copy is
+    revalidated even if it is still fresh.  See compile_repo_index() for
+    the index.
+    """
 
     repo = get_repo(repo)
 
     try:
         url = repo + META_YAML
-        meta_list = list(
-            yaml.load_all(
-                urllib.request.urlopen(url).read(), Loader=yaml.SafeLoader
-            )
-        )
+        content = read_cached_url(url, refresh)
     except urllib.error.URLError:
         try:
             url = repo + META_YML
-            meta_list = list(
-                yaml.load_all(
-                    urllib.request.urlopen(url).read(), Loader=yaml.SafeLoader
-                )
-            )
+            content = read_cached_url(url, refresh)
         except urllib.error.URLError:
             logger = logging.getLogger(__name__)
             logger.error("Repo connection problem.", exc_info=True)
             raise RepoAccessException(repo)
 
-    return meta_list, repo
+    return compile_repo_index(url, content), repo
+
+
+def compile_repo_index(url, content):
+    """Compile the meta data file <content> fetched from <url> into an index.
+
+    The index is a dict of:
+      'digest':  SHA1 of <content>.
+      'entries': the list of entries in the meta data file.
+      'names':   the position in 'entries' of the first entry of each model.
+
+    An entry without meta data or model name raises
+    MalformedPackagesDotYAMLException.
+
+    The index is pickled next to the cached copy of <url>, so that the
+    YAML is only parsed again when <content> changes.
+    """
+
+    logger = logging.getLogger(__name__)
+    digest = hashlib.sha1(content).hexdigest()
+    index_file = get_url_cache_paths(url)[0] + ".index"
+
+    try:
+        with open(index_file, "rb") as file:
+            index = pickle.load(file)
+        if index["digest"] == digest:
+            logger.debug("Use compiled index {}".format(index_file))
+            return index
+    except FileNotFoundError:
+        pass
+    except Exception:
+        logger.warning("Ignore broken index: {}".format(index_file))
+
+    entries = list(load_all_yaml(content))
+    names = {}
+    for position, entry in enumerate(entries):
+        meta = entry.get("meta") if isinstance(entry, dict) else None
+        if not isinstance(meta, dict) or "name" not in meta:
+            raise MalformedPackagesDotYAMLException(
+                "name" if isinstance(meta, dict) else "meta",
+                "#{} in {}".format(position + 1, url),
+            )
+        names.setdefault(meta["name"], position)
+
+    index = {"digest": digest, "entries": entries, "names": names}
+
+    try:
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        write_atomically(
+            index_file, pickle.dumps(index, pickle.HIGHEST_PROTOCOL)
+        )
+    except OSError:
+        logger.warning("Failed to save index {}".format(index_file))
+
+    return index
+
+
+def get_url_cache_paths(url, cache_dir=META_CACHE_DIR):
+    """Return the paths of the cached content of <url> and its info file."""
+
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, key)
+
+    return path, path + ".json"
+
+
+def read_cached_url(url, refresh=False, ttl=META_CACHE_TTL, headers=None):
+    """Return the content of <url> through a local cached copy.
+
+    The cached copy is used without accessing <url> if it was fetched
+    within <ttl> seconds, unless <refresh> is True.  Otherwise it is
+    revalidated by a conditional GET with the ETag and Last-Modified
+    validators recorded when it was fetched.  The cached copy is also
+    used if <url> cannot be reached at all.  <headers> are sent with
+    the request, but the copy is cached by <url> alone.
+    """
+
+    logger = logging.getLogger(__name__)
+    content_file, info_file = get_url_cache_paths(url)
+
+    info = None
+    if os.path.exists(content_file) and os.path.exists(info_file):
+        try:
+            with open(info_file, "r") as file:
+                info = json.load(file)
+        except ValueError:
+            logger.warning("Ignore broken cache info: {}".format(info_file))
+
+    if (
+        info is not None
+        and not refresh
+        and 0 <= time.time() - info["fetched"] < ttl
+    ):
+        logger.debug("Use cached copy of {}".format(url))
+        with open(content_file, "rb") as file:
+            return file.read()
+
+    headers = dict(headers or {})
+    if info is not None:
+        if info.get("etag"):
+            headers["If-None-Match"] = info["etag"]
+        if info.get("last_modified"):
+            headers["If-Modified-Since"] = info["last_modified"]
+
+    content = None
+    try:
+        with urlopen(url, headers) as response:
+            content = response.read()
+        headers = response.headers
+    except urllib.error.HTTPError as error:
+        if error.code != 304 or info is None:
+            raise
+        logger.debug("Cached copy of {} is still valid.".format(url))
+        headers = error.headers
+    except urllib.error.URLError:
+        if info is None:
+            raise
+        logger.warning(
+            "Cannot access {}, use cached copy.".format(url), exc_info=True
+        )
+        with open(content_file, "rb") as file:
+            return file.read()
+
+    cached = info is not None
+    info = {
+        "url": url,
+        "etag": headers.get("ETag") or (info or {}).get("etag"),
+        "last_modified": headers.get("Last-Modified")
+        or (info or {}).get("last_modified"),
+        "fetched": time.time(),
+    }
+
+    try:
+        os.makedirs(os.path.dirname(content_file), exist_ok=True)
+        if content is None:
+            with open(content_file, "rb") as file:
+                content = file.read()
+        else:
+            write_atomically(content_file, content)
+        write_atomically(info_file, json.dumps(info).encode("utf-8"))
+    except OSError:
+        logger.warning("Failed to cache {}".format(url), exc_info=True)
+
+    # The cache only grows when a URL is cached anew.
+
+    if not cached:
+        try:
+            prune_url_cache(max_entries=META_CACHE_MAX_ENTRIES)
+        except OSError:
+            logger.warning("Failed to prune cache", exc_info=True)
+
+    return content
+
+
+def prune_url_cache(
+    max_age=META_CACHE_MAX_AGE, max_entries=None, cache_dir=META_CACHE_DIR
+):
+    """Remove the cached copies of URLs in <cache_dir>, see
+    read_cached_url(), which were not fetched or revalidated within
+    <max_age> seconds, and the oldest ones beyond <max_entries> if given,
+    together with their compiled index if any.  Broken ones are removed
+    as well.
+
+    The info file of a copy is rewritten each time it is fetched or
+    revalidated, so its modification time tells the age of the copy.  The
+    copies of content at a commit SHA, used without any request, are thus
+    fetched again once removed after <max_age> seconds.
+
+    Return the number of cached copies removed.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    keys = set()
+    contents = set()
+    fetched = {}
+    try:
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                match = re.fullmatch(
+                    r"([0-9a-f]{40})(\.json|\.index)?", entry.name
+                )
+                if match is None:
+                    continue
+
+                key, ext = match.groups()
+                keys.add(key)
+                if ext is None:
+                    contents.add(key)
+                elif ext == ".json":
+                    try:
+                        fetched[key] = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        pass
+    except FileNotFoundError:
+        return 0
+
+    now = time.time()
+    keep = sorted(
+        (
+            key
+            for key in contents & set(fetched)
+            if 0 <= now - fetched[key] < max_age
+        ),
+        key=fetched.get,
+        reverse=True,
+    )
+    if max_entries is not None:
+        keep = keep[:max_entries]
+
+    removed = 0
+    for key in keys.difference(keep):
+        path = os.path.join(cache_dir, key)
+        logger.debug("Remove cached copy {}".format(path))
+        for x in (path, path + ".json", path + ".index"):
+            remove_file_or_dir(x)
+        removed += 1
+
+    return removed
 
 
 def print_meta_line(entry):
@@ -190,226 +512,1352 @@ def load_description(model):
     return entry
 
 
-def read_mlhubyaml(name):
-    """Read description from a specified local yaml file or the url of a
-yaml file."""
+def read_installed_index():
+    """Return the index of installed models."""
+
+    try:
+        with open(os.path.join(get_init_dir(), INSTALLED_INDEX), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_installed_index(index):
+    """Write the <index> of installed models."""
+
+    try:
+        content = json.dumps(index, indent=2, default=str)
+        write_atomically(
+            os.path.join(get_init_dir(), INSTALLED_INDEX),
+            content.encode("utf-8"),
+        )
+    except OSError:
+        logger = logging.getLogger(__name__)
+        logger.warning("Failed to write installed index", exc_info=True)
+
+
+def load_installed_description(model, index):
+    """Load the meta data and commands of the installed <model> through the
+    <index> of installed models.
+
+    The index records, for each model, the path and modification time of
+    its description YAML file and the modification time of the package
+    dir, together with its meta data and commands.  The record is used as
+    long as neither is modified since, otherwise the YAML file is found
+    and loaded again and the record updated.  The package dir changes
+    when a YAML file is added, removed or renamed in it, which may change
+    the one taking precedence.
+    """
+
+    record = index.pop(model, None)
+    if record is not None:
+        try:
+            mtime = os.stat(record["yaml"]).st_mtime_ns
+            dir_mtime = os.stat(os.path.dirname(record["yaml"])).st_mtime_ns
+        except OSError:
+            mtime = dir_mtime = None
+
+        if mtime == record["mtime"] and dir_mtime == record.get("dir_mtime"):
+            index[model] = record
+            return {"meta": record["meta"], "commands": record["commands"]}
+
+    desc = get_available_pkgyaml(model)
+    entry = read_mlhubyaml(desc)
+    meta = entry["meta"]
+    keys = ["name", "version", "title", "description", "languages"]
+    index[model] = {
+        "yaml": desc,
+        "mtime": os.stat(desc).st_mtime_ns,
+        "dir_mtime": os.stat(os.path.dirname(desc)).st_mtime_ns,
+        "meta": {k: meta[k] for k in keys if k in meta},
+        "commands": list(entry.get("commands", [])),
+    }
+
+    return entry
+
+
+def update_installed_index(model, remove=False):
+    """Refresh the record of <model> in the index of installed models, or
+remove it if <remove>.  Return the description of <model> if refreshed."""
+
+    index = read_installed_index()
+    index.pop(model, None)
+    entry = None if remove else load_installed_description(model, index)
+    write_installed_index(index)
+
+    return entry
+
+
+def read_mlhubyaml(name):
+    """Read description from a specified local yaml file or the url of a
+    yaml file.
+
+    The description of a local yaml file is only loaded once in a
+    process, unless the file is modified.  A copy is returned each time,
+    as callers may modify it.
+    """
+
+    import yaml
+
+    key = None
+    if not is_url(name):
+        try:
+            key = (os.path.abspath(name), os.stat(name).st_mtime_ns)
+        except OSError:
+            pass
+        else:
+            if key in _description_cache:
+                return copy.deepcopy(_description_cache[key])
+
+    try:
+
+        # Keep the order of entries specified inside YAML file, because
+        # the order of commands matters.
+
+        entry = load_yaml(read_repo_raw_file(name), ordered=True)
+
+    except yaml.YAMLError:
+
+        # libyaml reports some errors as ParserError where the pure
+        # Python loader reports ScannerError, so catch them all.
+
+        raise MalformedYAMLException(name)
+
+    except urllib.error.URLError:
+
+        raise YAMLFileAccessException(name)
+
+    if key is not None:
+        _description_cache[key] = copy.deepcopy(entry)
+
+    return entry
+
+
+def clear_description_cache():
+    """Clear the in-process caches of the package descriptions, after a
+package is installed or removed."""
+
+    _pkgyaml_cache.clear()
+    _description_cache.clear()
+    _raw_file_cache.clear()
+
+
+def get_model_info_from_repo(model, repo, refresh=False):
+    """Get model url on mlhub.
+
+    Args:
+        model (str): model name.
+        repo (str): packages list url.
+        refresh (bool): revalidate the cached packages list.
+
+    Returns:
+        url: model url for download.
+        meta: list of all model meta data.
+
+    Raises:
+        ModelNotFoundOnRepoException
+    """
+
+    url = None
+    version = None
+    index, repo = get_repo_index(repo, refresh)
+    meta_list = index["entries"]
+
+    # Find the first matching entry in the meta data.
+
+    position = index["names"].get(model)
+    if position is not None:
+        try:
+            meta = meta_list[position]["meta"]
+            if "yaml" in meta:
+                url = meta["yaml"]
+            else:
+                url = meta["url"]
+
+            # If url refers to an archive, its version must be known.
+
+            if is_archive_file(url):
+                version = meta["version"]
+        except KeyError as e:
+            raise MalformedPackagesDotYAMLException(e.args[0], model)
+
+    # If not found suggest how a model might be installed.
+
+    if url is None:
+        logger = logging.getLogger(__name__)
+        logger.error("Model '{}' not found on Repo '{}'.".format(model, repo))
+        raise ModelNotFoundOnRepoException(model, repo)
+
+    return url, version, meta_list
+
+
+def interpret_mlm_name(mlm):
+    """Interpret model package file name into model name and version number.
+
+    Args:
+        mlm (str): mlm file path or url.
+
+    Returns:
+        file name, model name, version number.
+    """
+
+    if not ends_with_mlm(mlm):
+        raise MalformedMLMFileNameException(mlm)
+
+    mlmfile = os.path.basename(mlm)
+    try:
+        model, version = mlmfile.split("_")
+    except ValueError:
+        raise MalformedMLMFileNameException(mlm)
+
+    version = ".".join(version.split(".")[:-1])
+
+    return model, version
+
+
+def get_available_pkgyaml(url):
+    """Return the available package yaml file path.
+
+    Possible options are MLHUB.yaml, DESCRIPTION.yaml or
+    DESCRIPTION.yml.  If both exist, MLHUB.yaml takes precedence.
+    Path can be a path to the package directory or a URL to the top
+    level of the package repo.
+
+    The file found in a package directory is remembered in the process
+    until clear_description_cache(), as long as it still exists.
+    """
+
+    yaml_list = [MLHUB_YAML, DESC_YAML, DESC_YML]
+
+    if RepoTypeURL.is_repo_url(url):
+        yaml_list = [url.format(x) for x in yaml_list]
+    elif is_url(url):
+        yaml_list = ["/".join([url, x]) for x in yaml_list]
+    else:
+        if os.path.sep not in url:  # url is a model name
+            url = os.path.join(get_init_dir(), url)
+        yaml_list = [os.path.join(url, x) for x in yaml_list]
+
+    logger = logging.getLogger(__name__)
+    logger.debug("Finding MLHUB.yaml ...")
+    logger.debug("Possible locations: {}".format(yaml_list))
+
+    if is_url(url):
+        param = yaml_list[0]
+        found = probe_remote_pkgyaml(yaml_list)
+        if found is not None:
+            logger.debug("YAML: {}".format(found))
+            return found
+    else:
+        param = url
+        cached = _pkgyaml_cache.get(url)
+        if cached is not None and os.path.exists(cached):
+            return cached
+
+        for x in yaml_list:
+            if os.path.exists(x):
+                logger.debug("YAML: {}".format(x))
+                _pkgyaml_cache[url] = x
+                return x
+
+    raise DescriptionYAMLNotFoundException(param)
+
+
+def probe_remote_pkgyaml(urls):
+    """Return the first of <urls> of package yaml files which exists, or
+    None.
+
+    The first URL, the one most packages have, is read alone, so that
+    nothing else is downloaded when it exists.  Otherwise the others are
+    read at the same time.  They are read through read_repo_raw_file(),
+    which keeps their content for when the file found is then read.  The
+    URLs found missing (404) are recorded in PKGYAML_MISS_FILE, and not
+    tried again within META_CACHE_TTL seconds.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    try:
+        with open(PKGYAML_MISS_FILE, "r") as file:
+            misses = json.load(file)
+    except (OSError, ValueError):
+        misses = {}
+
+    now = time.time()
+    misses = {
+        x: t for x, t in misses.items() if 0 <= now - t < META_CACHE_TTL
+    }
+
+    candidates = [x for x in urls if x not in misses]
+    logger.debug("Known missing: {}".format(set(urls) - set(candidates)))
+    if not candidates:
+        return None
+
+    found = None
+    missed = False
+    for batch in (candidates[:1], candidates[1:]):
+        if found is not None or not batch:
+            break
+
+        with concurrent.futures.ThreadPoolExecutor(len(batch)) as executor:
+            futures = [executor.submit(read_repo_raw_file, x) for x in batch]
+
+        for x, future in zip(batch, futures):
+            error = future.exception()
+            if error is None:
+                found = found or x
+            elif (
+                isinstance(error, urllib.error.HTTPError) and error.code == 404
+            ):
+                misses[x] = now
+                missed = True
+            elif not isinstance(error, urllib.error.URLError):
+                raise error
+
+    if missed:
+        try:
+            os.makedirs(os.path.dirname(PKGYAML_MISS_FILE), exist_ok=True)
+            write_atomically(
+                PKGYAML_MISS_FILE, json.dumps(misses).encode("utf-8")
+            )
+        except OSError:
+            logger.warning("Failed to save {}".format(PKGYAML_MISS_FILE))
+
+    return found
+
+
+# ----------------------------------------------------------------------
+# YAML
+# ----------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def get_yaml_loader(ordered=False):
+    """Return the safe YAML loader, which loads mappings as OrderedDict if
+    <ordered> is True.
+
+    The loaders based on libyaml are much faster than the pure Python
+    ones, but libyaml may not be available where PyYAML was built without
+    it.  The loader is only created when first needed, so that yaml is
+    not imported by commands which do not read any YAML.
+    """
+
+    import yaml
+
+    safe_loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    if not ordered:
+        return safe_loader
+
+    class YAMLOrderedLoader(safe_loader):
+        """Safe YAML loader which loads mappings as OrderedDict."""
+
+        def construct_ordered_map(self, node):
+            data = collections.OrderedDict()
+            yield data
+            data.update(self.construct_mapping(node))
+
+        def construct_mapping(self, node, deep=False):
+            if not isinstance(node, yaml.MappingNode):
+                raise yaml.constructor.ConstructorError(
+                    None,
+                    None,
+                    "expected a mapping node, but found {}".format(node.id),
+                    node.start_mark,
+                )
+
+            self.flatten_mapping(node)
+            mapping = collections.OrderedDict()
+            for key_node, value_node in node.value:
+                key = self.construct_object(key_node, deep=deep)
+                mapping[key] = self.construct_object(value_node, deep=deep)
+
+            return mapping
+
+    YAMLOrderedLoader.add_constructor(
+        "tag:yaml.org,2002:map", YAMLOrderedLoader.construct_ordered_map
+    )
+
+    return YAMLOrderedLoader
+
+
+def load_yaml(stream, ordered=False):
+    """Load the single YAML document in <stream>.
+
+    Mappings are loaded as OrderedDict if <ordered> is True.
+    """
+
+    import yaml
+
+    return yaml.load(stream, Loader=get_yaml_loader(ordered))
+
+
+def load_all_yaml(stream, ordered=False):
+    """Load all YAML documents in <stream> as a list."""
+
+    import yaml
+
+    return list(yaml.load_all(stream, Loader=get_yaml_loader(ordered)))
+
+
+# ----------------------------------------------------------------------
+# String manipulation
+# ----------------------------------------------------------------------
+
+
+def dropdot(sentence):
+    """Drop the period after a sentence."""
+    return re.sub("[.]$", "", sentence)
+
+
+def drop_newline(paragraph):
+    """Drop trailing newlines."""
+
+    return re.sub("\n$", "", paragraph)
+
+
+def lower_first_letter(sentence):
+    """Lowercase the first letter of a sentence."""
+
+    return sentence[:1].lower() + sentence[1:] if sentence else ""
+
+
+def drop_archive_ext(name):
+    return re.sub(r"(\.zip|\.tar|\.tar\.gz|\.tar\.bz2|\.bz2)$", "", name)
+
+
+# ----------------------------------------------------------------------
+# URL and download
+# ----------------------------------------------------------------------
+
+
+def get_http_session(pool_size=HTTP_POOL_SIZE):
+    """Return the HTTP session shared by all the requests of the process.
+
+    Its connections are pooled per host and kept alive, so that the
+    requests to a host after the first need no new TCP and TLS
+    handshake.  The pools are enlarged to keep <pool_size> connections
+    if smaller, so that downloads about to run that many at the same
+    time do not have theirs discarded.
+    """
+
+    global _http_session, _http_pool_size
+
+    import requests
+    import requests.adapters
+
+    if _http_session is None:
+
+        # Content is not compressed in transit, so that Content-Length
+        # and byte ranges are those of the content, as with urllib.
+
+        session = requests.Session()
+        session.headers.update(
+            {"User-Agent": HTTP_USER_AGENT, "Accept-Encoding": "identity"}
+        )
+        _http_session = session
+
+    if pool_size > _http_pool_size:
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE, pool_maxsize=pool_size
+        )
+        _http_session.mount("http://", adapter)
+        _http_session.mount("https://", adapter)
+        _http_pool_size = pool_size
+
+    return _http_session
+
+
+def urlopen(url, headers=None, method="GET"):
+    """Request <url> through the shared HTTP session.
+
+    Return an HTTPResponse whose content is read as needed.  As with
+    urllib.request.urlopen(), an error status, or 304 Not Modified,
+    raises urllib.error.HTTPError, and a failure to connect raises
+    urllib.error.URLError with the cause as its reason.
+    """
+
+    import requests
+
+    try:
+        response = get_http_session().request(
+            method, url, headers=headers, stream=True, timeout=HTTP_TIMEOUT
+        )
+    except requests.exceptions.RequestException as error:
+        reason = error
+        while reason.__cause__ or reason.__context__:
+            reason = reason.__cause__ or reason.__context__
+        raise urllib.error.URLError(reason)
+
+    if response.status_code >= 400 or response.status_code == 304:
+        response.close()
+        raise urllib.error.HTTPError(
+            url, response.status_code, response.reason, response.headers, None
+        )
+
+    return HTTPResponse(response)
+
+
+def read_url(url, headers=None):
+    """Return the content of <url>, see urlopen()."""
+
+    with urlopen(url, headers) as response:
+        return response.read()
+
+
+class HTTPResponse(object):
+    """Response of urlopen(), read like those of urllib.request.urlopen().
+
+    <length> is the number of bytes of the content yet to be read, or
+    None if unknown.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+
+        length = response.headers.get("Content-Length")
+        self.length = int(length) if length and length.isdigit() else None
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def read(self, amt=None):
+        """Read up to <amt> bytes of the content, or all of it if None.
+
+        As with urllib, fewer than <amt> bytes may be returned, so that
+        what was received is not lost if the connection then fails.  A
+        connection lost or timed out while reading raises the errors
+        urllib would, such as http.client.IncompleteRead.
+        """
+
+        import urllib3
+
+        raw = self.response.raw
+        try:
+            if amt is not None and hasattr(raw, "read1"):
+                data = raw.read1(amt, decode_content=True)
+            else:
+                data = raw.read(amt, decode_content=True)
+        except urllib3.exceptions.ReadTimeoutError as error:
+            raise TimeoutError(str(error))
+        except urllib3.exceptions.ProtocolError as error:
+            cause = error.args[-1]
+            if isinstance(cause, Exception):
+                raise cause
+            raise ConnectionError(str(error))
+
+        if self.length is not None:
+            self.length = max(0, self.length - len(data))
+
+        return data
+
+    def close(self):
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def is_url(name):
+    """Check if name is a url."""
+
+    return re.findall("http[s]?:", name)
+
+
+def get_response_filename(response, url):
+    """Obtain the file name from the response of urlopen() to <url>, or
+    None if not available.
+
+    The name is given by the Content-Disposition header of the response,
+    or else by <url> as requested.  The URL of the response, which <url>
+    may have redirected to, is only used when <url> does not name an
+    archive but the response URL does, since it may name a blob.
+    """
+
+    info = response.getheader("Content-Disposition")
+    if info:
+        header = email.message.Message()
+        header["Content-Disposition"] = info
+        if header.get_filename():
+            return header.get_filename()
+
+    filename = os.path.basename(url.split("?")[0])
+    redirected = os.path.basename(response.url.split("?")[0])
+    if not is_archive_file(filename) and is_archive_file(redirected):
+        filename = redirected
+
+    return filename or redirected or None
+
+
+def download_model_pkg(
+    url, local, pkgfile, quiet, connections=1, response=None
+):
+    """Download the model package mlm or zip file from <url> to <local>.
+
+    See download_url() for <connections> and <response>.  The size of the
+    package is told from the response the package is downloaded with,
+    unless a partial download is resumed.
+    """
+
+    if not quiet:
+        print("Package " + url + "\n")
+
+    # The partial download is kept out of the temporary dir of <local>,
+    # so that it can be resumed by the next `ml install` if interrupted.
+
+    part = get_partial_download_path(url)
+    get_http_session(connections)
+    if response is None and not os.path.exists(part):
+        response = urlopen(url)
+    if response is not None and response.status != 200:
+        response.close()
+        raise ModelURLAccessException(url)
+
+    if not quiet:
+        msg = "Downloading '{}'".format(pkgfile)
+        if os.path.exists(part):
+            msg = "Resuming the download of '{}'".format(pkgfile)
+
+        # Content-Length is not always necessarily available.
+
+        elif response.length is not None:
+            msg += " ({:,} bytes)".format(response.length)
+        msg += " ...\n"
+        print(msg)
+
+    try:
+        download_url(
+            url, local, part=part, connections=connections, response=response
+        )
+    except (
+        urllib.error.URLError,
+        http.client.HTTPException,
+        ConnectionError,
+        TimeoutError,
+    ) as error:
+        reason = getattr(error, "reason", "connection closed early")
+        raise ModelDownloadHaltException(url, str(reason).lower())
+
+
+def can_stream_model_pkg(url, pkgfile, connections=1):
+    """Check if the model package at <url> can be extracted as it downloads.
+
+    Only tarballs can, since a zip file has its index at the end.  A
+    download over several connections, or one resuming a partial
+    download, is done first instead.
+    """
+
+    return (
+        is_tar(pkgfile)
+        and connections <= 1
+        and not os.path.exists(get_partial_download_path(url))
+    )
+
+
+def stream_model_pkg(url, dest, pkgfile, quiet, response=None):
+    """Download the tarball model package from <url> and extract it into
+    <dest> at the same time, without keeping the archive.  <response> is
+    the one of urlopen(<url>) if already opened.
+
+    Members are extracted as they arrive into a staging dir next to
+    <dest>, which is then moved to <dest>.  As with unpack_with_promote(),
+    if all files are under a top level dir, that dir becomes <dest>.
+
+    No copy of the archive is kept, so if the download breaks, the next
+    `ml install` starts over.  Only a package of STREAM_RESUME_MIN_SIZE
+    bytes or more, which is costly to download again, is also written
+    into the partial download of <url>, see get_partial_download_path(),
+    if the server can resume it.  The next `ml install` then resumes it
+    instead, see download_model_pkg().
+
+    Return whether promotion happened, the top level dir if did, and the
+    list of extracted files.
+    """
+
+    import tarfile
+
+    logger = logging.getLogger(__name__)
+
+    if not quiet:
+        print("Package " + url + "\n")
+
+    if response is None:
+        response = urlopen(url)
+    if response.status != 200:
+        response.close()
+        raise ModelURLAccessException(url)
+
+    if not quiet:
+        msg = "Downloading and extracting '{}'".format(pkgfile)
+        dsize = response.getheader("Content-Length")
+        if dsize is not None:
+            msg += " ({:,} bytes)".format(int(dsize))
+        msg += " ...\n"
+        print(msg)
+
+    # Recorded as download_url() does, to resume with If-Range.
+
+    part = get_partial_download_path(url)
+    info = {
+        "url": url,
+        "validator": response.getheader("ETag")
+        or response.getheader("Last-Modified"),
+    }
+    if (
+        (response.length or 0) < STREAM_RESUME_MIN_SIZE
+        or info["validator"] is None
+        or response.getheader("Accept-Ranges", "none") == "none"
+    ):
+        part = os.devnull
+    else:
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        with open(part + ".json", "w") as file:
+            json.dump(info, file)
+
+    logger.debug("Stream {} into {}".format(url, dest))
+    staging = tempfile.mkdtemp(dir=os.path.dirname(dest), prefix=".stream-")
+    try:
+        file_list, files = [], []
+        with response, open(part, "wb") as copy, tarfile.open(
+            fileobj=TeeReader(response, copy), mode="r|*"
+        ) as pkg:
+            for member in pkg:
+                file_list.append(member.name)
+                if not member.isdir():
+                    files.append(member.name)
+                pkg.extract(member, staging)
+
+        if part != os.devnull:
+            remove_file_or_dir(part)
+            remove_file_or_dir(part + ".json")
+
+        top_dir = get_archive_top_dir(file_list)
+        remove_file_or_dir(dest)
+        if top_dir is None:
+            os.rename(staging, dest)
+            return False, top_dir, file_list
+
+        os.rename(os.path.normpath(os.path.join(staging, top_dir)), dest)
+        prefix = top_dir + os.path.sep
+        return True, top_dir, [x[len(prefix) :] for x in files]
+
+    except (
+        urllib.error.URLError,
+        http.client.HTTPException,
+        ConnectionError,
+        TimeoutError,
+    ) as error:
+        reason = getattr(error, "reason", "connection closed early")
+        raise ModelDownloadHaltException(url, str(reason).lower())
+
+    except (tarfile.ReadError, EOFError):
+        if not response.length:  # Not truncated, but a broken archive.
+            if part != os.devnull:
+                remove_file_or_dir(part)
+                remove_file_or_dir(part + ".json")
+            raise
+        raise ModelDownloadHaltException(url, "connection closed early")
+
+    finally:
+        remove_file_or_dir(staging)
+
+
+class TeeReader:
+    """File object reading from <fileobj> and writing what it reads into
+    the file object <copy> as well."""
+
+    def __init__(self, fileobj, copy):
+        self.fileobj = fileobj
+        self.copy = copy
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.copy.write(data)
+        return data
+
+
+def get_partial_download_path(url):
+    """Return the path where the partial download of <url> is kept."""
+
+    return os.path.join(
+        PARTIAL_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest()
+    )
+
+
+def prune_partial_downloads(max_age=PARTIAL_MAX_AGE):
+    """Remove the partial downloads, of model packages in PARTIAL_DIR and
+    of file dependencies next to their archive or cache file, with their
+    info files, not written to within <max_age> seconds.
+
+    Return the number of partial downloads removed.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    mtimes = {}
+    for top in (ARCHIVE_DIR, CACHE_DIR):
+        for path, dirs, files in os.walk(top):
+            for name in files:
+                key = os.path.join(path, name)
+                if key.endswith(".json"):
+                    key = key[: -len(".json")]
+                if path != PARTIAL_DIR and not key.endswith(".part"):
+                    continue
+                try:
+                    mtime = os.path.getmtime(os.path.join(path, name))
+                except FileNotFoundError:
+                    continue
+                mtimes[key] = max(mtime, mtimes.get(key, mtime))
+
+    now = time.time()
+    removed = 0
+    for key, mtime in mtimes.items():
+        if 0 <= now - mtime < max_age:
+            continue
+
+        logger.debug("Remove partial download {}".format(key))
+        remove_file_or_dir(key)
+        remove_file_or_dir(key + ".json")
+        removed += 1
+
+    return removed
+
+
+def download_url(
+    url,
+    path,
+    part=None,
+    connections=1,
+    chunk_size=1024 * 1024,
+    digest=None,
+    response=None,
+    cancel=None,
+):
+    """Download <url> into <path>, resuming a previous partial download.
+
+    The content is written into <part> (<path>.part by default), which is
+    only moved to <path> once complete.  If <part> already exists, the
+    download is resumed from its end with an HTTP Range request.  The
+    If-Range header, with the validator (ETag or Last-Modified) recorded
+    when the download started, ensures the server sends the whole
+    content again instead if it has changed since.
+
+    If <connections> is more than one and the server supports range
+    requests, a large file is split into up to <connections> segments
+    downloaded at the same time, see download_segments().
+
+    If <digest> is given, it is a hashlib object updated with the content
+    as it is written, including what is already in <part>.
+
+    <response> is one of urlopen(<url>) already opened, for instance to
+    find the file name, which is then downloaded from instead of
+    requesting <url> again.  It is closed unused if the download resumes.
+
+    If <cancel> is given, it is a threading.Event checked between chunks,
+    and the download stops with URLError once it is set.  What has been
+    downloaded is kept to be resumed.
+
+    Return the validator of the content downloaded, or None if the
+    server provides none.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    first = None
+    if part is None:
+        part = path + ".part"
+    info_file = part + ".json"
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+
+    info = {}
+    if os.path.exists(part) and os.path.exists(info_file):
+        try:
+            with open(info_file, "r") as file:
+                info = json.load(file)
+        except ValueError:
+            info = {}
+
+    if "segments" not in info:
+        offset = os.path.getsize(part) if info.get("validator") else 0
+
+        headers = {}
+        if offset > 0:
+            headers["Range"] = "bytes={}-".format(offset)
+            headers["If-Range"] = info["validator"]
+            if response is not None:
+                response.close()
+                response = None
+
+        try:
+            if response is None:
+                response = urlopen(url, headers)
+        except urllib.error.HTTPError as error:
+            if error.code != 416 or offset == 0:
+                raise
+
+            # Range not satisfiable, the partial download is unusable.
+
+            logger.debug("Discard partial download {}".format(part))
+            remove_file_or_dir(part)
+            remove_file_or_dir(info_file)
+            return download_url(
+                url, path, part, connections, chunk_size, digest, None, cancel
+            )
+
+        try:
+            size = response.getheader("Content-Length")
+            size = None if size is None else int(size)
+
+            if response.status == 206:
+                content_range = response.getheader("Content-Range", "")
+                if not content_range.startswith("bytes {}-".format(offset)):
+                    remove_file_or_dir(part)
+                    raise urllib.error.URLError(
+                        "Unexpected Content-Range: {}".format(content_range)
+                    )
+
+                logger.debug("Resume {} from byte {}".format(url, offset))
+                mode = "ab"
+            else:
+                offset = 0
+                mode = "wb"
+                info = {
+                    "url": url,
+                    "validator": response.getheader("ETag")
+                    or response.getheader("Last-Modified"),
+                }
+
+                if (
+                    info["validator"] is None
+                    or response.getheader("Accept-Ranges", "none") == "none"
+                ):
+                    remove_file_or_dir(info_file)
+                else:
+                    if size and connections > 1:
+                        segments = split_segments(size, connections)
+                        if len(segments) > 1:
+                            info["size"] = size
+                            info["segments"] = segments
+
+                    with open(info_file, "w") as file:
+                        json.dump(info, file)
+
+            if "segments" not in info:
+                if digest is not None and mode == "ab":
+                    hash_file(part, digest, chunk_size)
+
+                with open(part, mode) as file:
+                    while True:
+                        if cancel is not None and cancel.is_set():
+                            raise urllib.error.URLError("Download cancelled")
+                        chunk = response.read(chunk_size)
+                        if not chunk:
+                            break
+                        file.write(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+
+                if size is not None and os.path.getsize(part) != offset + size:
+                    raise urllib.error.URLError(
+                        "Incomplete download {} of {} bytes".format(
+                            os.path.getsize(part), offset + size
+                        )
+                    )
+            else:
+
+                # The response is the start of the first segment.
+
+                first, response = response, None
+        finally:
+            if response is not None:
+                response.close()
+
+    if "segments" in info:
+        if response is not None:
+            response.close()
+
+        logger.debug(
+            "Download {} in {} segments".format(url, len(info["segments"]))
+        )
+        if not download_segments(
+            url, part, info, chunk_size, cancel, response=first
+        ):
+            logger.debug("{} changed, download again".format(url))
+            remove_file_or_dir(part)
+            remove_file_or_dir(info_file)
+            return download_url(
+                url, path, part, connections, chunk_size, digest, None, cancel
+            )
+
+        # Segments are downloaded out of order, thus hashed at the end.
+
+        if digest is not None:
+            hash_file(part, digest, chunk_size)
+
+    shutil.move(part, path)
+    remove_file_or_dir(info_file)
+
+    return info.get("validator")
+
+
+def split_segments(size, connections, min_size=SEGMENT_MIN_SIZE):
+    """Split <size> bytes into up to <connections> segments of at least
+<min_size> bytes.  Each segment is [start, end, done], where <done> is the
+number of bytes downloaded from <start>."""
+
+    count = max(1, min(connections, size // min_size))
+    step = -(-size // count)
+
+    return [
+        [start, min(start + step, size) - 1, 0]
+        for start in range(0, size, step)
+    ]
+
+
+def download_segments(url, part, info, chunk_size, cancel=None, response=None):
+    """Download the segments in info['segments'] of <url> into <part>.
+
+    Each segment is fetched by its own range request, with If-Range
+    against info['validator'], and written directly into its place in
+    <part>.  The progress of the segments is recorded in the info file
+    of <part> if the download fails or is interrupted, so that it can be
+    resumed.  See download_url() for <cancel>.
+
+    <response> is one of a plain GET of <url> already opened, which is
+    read for the first segment instead of requesting it again.
+
+    Returns False if the content of <url> has changed since the download
+    started, in which case <part> is useless.
+    """
+
+    segments = info["segments"]
+    info_file = part + ".json"
+    stop = threading.Event()
+    changed = threading.Event()
 
-    try:
+    with open(part, "ab") as file:
+        file.truncate(info["size"])
 
-        # Use yamlordereddictloader to keep the order of entries
-        # specified inside YAML file, because the order of commands
-        # matters.
+    def fetch(segment, response=None):
+        start, end, done = segment
+        if start + done > end:
+            if response is not None:
+                response.close()
+            return
 
-        entry = yaml.load(
-            read_repo_raw_file(name), Loader=yamlordereddictloader.Loader
-        )
+        if response is None:
+            headers = {
+                "Range": "bytes={}-{}".format(start + done, end),
+                "If-Range": info["validator"],
+            }
+            response = urlopen(url, headers)
+            if response.status != 206:
+                response.close()
+                changed.set()
+                stop.set()
+                return
+
+        with response:
+            with open(part, "r+b") as file:
+                file.seek(start + done)
+                while not stop.is_set() and start + segment[2] <= end:
+                    if cancel is not None and cancel.is_set():
+                        raise urllib.error.URLError("Download cancelled")
+                    chunk = response.read(
+                        min(chunk_size, end + 1 - start - segment[2])
+                    )
+                    if not chunk:
+                        break
+                    file.write(chunk)
+                    segment[2] += len(chunk)
+
+        if start + segment[2] <= end and not stop.is_set():
+            raise urllib.error.URLError(
+                "Incomplete download of bytes {}-{}".format(start, end)
+            )
 
-    except (yaml.composer.ComposerError, yaml.scanner.ScannerError):
+    executor = concurrent.futures.ThreadPoolExecutor(len(segments))
+    futures = [
+        executor.submit(fetch, segment, response if i == 0 else None)
+        for i, segment in enumerate(segments)
+    ]
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        if not changed.is_set():
+            with open(info_file, "w") as file:
+                json.dump(info, file)
 
-        raise MalformedYAMLException(name)
+    return not changed.is_set()
 
-    except urllib.error.URLError:
 
-        raise YAMLFileAccessException(name)
+# ----------------------------------------------------------------------
+# Store of downloaded files
+# ----------------------------------------------------------------------
 
-    return entry
 
+def get_store_blob_path(digest):
+    """Return the path of the blob with SHA-256 checksum <digest>."""
 
-def get_model_info_from_repo(model, repo):
-    """Get model url on mlhub.
+    return os.path.join(STORE_DIR, "blobs", digest)
 
-    Args:
-        model (str): model name.
-        repo (str): packages list url.
 
-    Returns:
-        url: model url for download.
-        meta: list of all model meta data.
+def get_store_record_path(url):
+    """Return the path of the record of which blob holds <url>."""
 
-    Raises:
-        ModelNotFoundOnRepoException
-    """
+    return os.path.join(
+        STORE_DIR, "urls", hashlib.sha1(url.encode("utf-8")).hexdigest()
+    )
 
-    url = None
-    version = None
-    meta_list, repo = get_repo_meta_data(repo)
 
-    # Find the first matching entry in the meta data.
+def read_store_record(url):
+    """Return the record of the copy of <url> in the store, with the
+    SHA-256 checksum of its blob as 'sha256', its validator as
+    'validator' and its file name as 'filename', or None if not stored."""
 
     try:
-        for entry in meta_list:
-            meta = entry["meta"]
-            if model == meta["name"]:
-                if "yaml" in meta:
-                    url = meta["yaml"]
-                else:
-                    url = meta["url"]
+        with open(get_store_record_path(url), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
 
-                # If url refers to an archive, its version must be known.
 
-                if is_archive_file(url):
-                    version = meta["version"]
+def hash_file(path, digest=None, chunk_size=1024 * 1024):
+    """Update the hashlib object <digest>, SHA-256 by default, with the
+content of the file <path> and return it."""
 
-                break
-    except KeyError as e:
-        raise MalformedPackagesDotYAMLException(e.args[0], model)
+    if digest is None:
+        digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
 
-    # If not found suggest how a model might be installed.
+    return digest
 
-    if url is None:
-        logger = logging.getLogger(__name__)
-        logger.error("Model '{}' not found on Repo '{}'.".format(model, repo))
-        raise ModelNotFoundOnRepoException(model, repo)
 
-    return url, version, meta_list
+def link_file(src, dst):
+    """Replace <dst> with a hard link to <src>, or a copy if cannot link."""
+
+    tmp = "{}.tmp-{}".format(dst, uuid.uuid4().hex)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
 
 
-def interpret_mlm_name(mlm):
-    """Interpret model package file name into model name and version number.
+def fetch_stored_file(url, path, immutable=False):
+    """Make <path> the copy of <url> in the store, if it is up to date.
 
-    Args:
-        mlm (str): mlm file path or url.
+    Whether the copy is up to date is checked by a conditional GET with
+    the validator recorded when <url> was downloaded, unless the content
+    of <url> is <immutable>, such as that of a given commit.  The copy is
+    also used if <url> cannot be reached at all.
 
-    Returns:
-        file name, model name, version number.
+    Return whether <path> is made.
     """
 
-    if not ends_with_mlm(mlm):
-        raise MalformedMLMFileNameException(mlm)
+    logger = logging.getLogger(__name__)
 
-    mlmfile = os.path.basename(mlm)
-    try:
-        model, version = mlmfile.split("_")
-    except ValueError:
-        raise MalformedMLMFileNameException(mlm)
+    record = read_store_record(url)
+    if record is None:
+        return False
 
-    version = ".".join(version.split(".")[:-1])
+    blob = get_store_blob_path(record["sha256"])
+    validator = record.get("validator")
+    if not os.path.exists(blob) or (validator is None and not immutable):
+        return False
 
-    return model, version
+    if not immutable:
+        if validator.startswith('"') or validator.startswith("W/"):
+            headers = {"If-None-Match": validator}
+        else:
+            headers = {"If-Modified-Since": validator}
 
+        try:
+            with urlopen(url, headers):
+                return False  # Changed since stored.
+        except urllib.error.HTTPError as error:
+            if error.code != 304:
+                return False
+        except urllib.error.URLError:
+            logger.warning(
+                "Cannot access {}, use stored copy.".format(url),
+                exc_info=True,
+            )
 
-def get_available_pkgyaml(url):
-    """Return the available package yaml file path.
+    logger.debug("Link stored copy of {} into {}".format(url, path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    link_file(blob, path)
 
-    Possible options are MLHUB.yaml, DESCRIPTION.yaml or
-    DESCRIPTION.yml.  If both exist, MLHUB.yaml takes precedence.
-    Path can be a path to the package directory or a URL to the top
-    level of the package repo.
-    """
+    return True
 
-    yaml_list = [MLHUB_YAML, DESC_YAML, DESC_YML]
 
-    if RepoTypeURL.is_repo_url(url):
-        yaml_list = [url.format(x) for x in yaml_list]
-    elif is_url(url):
-        yaml_list = ["/".join([url, x]) for x in yaml_list]
-    else:
-        if os.path.sep not in url:  # url is a model name
-            url = os.path.join(get_init_dir(), url)
-        yaml_list = [os.path.join(url, x) for x in yaml_list]
+def store_file(url, path, validator=None, digest=None, filename=None):
+    """Add the file <path> downloaded from <url> into the store.
 
-    logger = logging.getLogger(__name__)
-    logger.info("Finding MLHUB.yaml ...")
-    logger.debug("Possible locations: {}".format(yaml_list))
+    If the store has the same content already, from whatever URL, <path>
+    is replaced with a hard link to it, so that it is only kept once.
+    Nothing is stored if <path> cannot be hard linked into the store.
+    <digest> is the SHA-256 checksum of <path>, computed if not given.
+    <filename> is the name of the file told by <url>, recorded so that
+    other models need not request <url> to find it.
 
-    if is_url(url):
-        param = yaml_list[0]
-        for x in yaml_list:
-            try:
-                if urllib.request.urlopen(x).status == 200:
-                    logger.debug("YAML: {}".format(x))
-                    return x
-            except urllib.error.URLError:
-                continue
-    else:
-        param = url
-        for x in yaml_list:
-            if os.path.exists(x):
-                logger.debug("YAML: {}".format(x))
-                return x
+    The blob, and thus <path>, is made read-only, so that a model which
+    writes into its copy fails instead of changing that of other models.
+    """
 
-    raise DescriptionYAMLNotFoundException(param)
+    logger = logging.getLogger(__name__)
 
+    if digest is None:
+        digest = hash_file(path).hexdigest()
+    blob = get_store_blob_path(digest)
+    record = get_store_record_path(url)
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    os.makedirs(os.path.dirname(record), exist_ok=True)
 
-# ----------------------------------------------------------------------
-# String manipulation
-# ----------------------------------------------------------------------
+    try:
+        if os.path.exists(blob):
+            if not os.path.samefile(blob, path):
+                logger.debug("Share stored copy of {}".format(url))
+                link_file(blob, path)
+        else:
+            os.link(path, blob)
+        os.chmod(blob, 0o444)
+    except OSError:
+        logger.warning("Failed to store {}".format(path), exc_info=True)
+        return
+
+    content = {
+        "url": url,
+        "sha256": digest,
+        "validator": validator,
+        "filename": filename,
+    }
+    write_atomically(record, json.dumps(content).encode("utf-8"))
 
 
-def dropdot(sentence):
-    """Drop the period after a sentence."""
-    return re.sub("[.]$", "", sentence)
+def remove_stored_file(url):
+    """Remove the copy of <url> from the store, as it is found not to
+match the checksum expected.  Models linked to it are not affected."""
 
+    record = get_store_record_path(url)
+    try:
+        with open(record, "r") as file:
+            remove_file_or_dir(get_store_blob_path(json.load(file)["sha256"]))
+    except (OSError, ValueError, KeyError):
+        pass
 
-def drop_newline(paragraph):
-    """Drop trailing newlines."""
+    remove_file_or_dir(record)
 
-    return re.sub("\n$", "", paragraph)
 
+def remove_unused_blobs():
+    """Remove the blobs no longer linked from any model, and their records.
 
-def lower_first_letter(sentence):
-    """Lowercase the first letter of a sentence."""
+    A blob is only used by the models with a hard link to it, thus the
+    link count of a blob not used by any model is 1.
+    """
 
-    return sentence[:1].lower() + sentence[1:] if sentence else ""
+    logger = logging.getLogger(__name__)
 
+    blob_dir = os.path.join(STORE_DIR, "blobs")
+    record_dir = os.path.join(STORE_DIR, "urls")
+    if not os.path.exists(blob_dir):
+        return
 
-def drop_archive_ext(name):
-    return re.sub(r"(\.zip|\.tar|\.tar\.gz|\.tar\.bz2|\.bz2)$", "", name)
+    for digest in os.listdir(blob_dir):
+        blob = get_store_blob_path(digest)
+        if os.stat(blob).st_nlink <= 1:
+            logger.debug("Remove unused blob {}".format(blob))
+            os.remove(blob)
 
+    for name in os.listdir(record_dir):
+        record = os.path.join(record_dir, name)
+        try:
+            with open(record, "r") as file:
+                digest = json.load(file)["sha256"]
+        except (OSError, ValueError, KeyError):
+            digest = None
+        if digest is None or not os.path.exists(get_store_blob_path(digest)):
+            remove_file_or_dir(record)
 
-# ----------------------------------------------------------------------
-# URL and download
-# ----------------------------------------------------------------------
 
+def read_file_manifest(model):
+    """Return the manifest of the files downloaded for <model>.
 
-def is_url(name):
-    """Check if name is a url."""
+    The manifest maps the path of each file to its SHA-256 checksum, size
+    and modification time, so that it need not be hashed again unless it
+    has been changed.  It also maps the URL of each file to its file name,
+    so that it need not be requested to find it again.
+    """
 
-    return re.findall("http[s]?:", name)
+    path = os.path.join(get_package_archive_dir(model), FILE_MANIFEST)
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
 
 
-def get_url_filename(url):
-    """Obtain the file name from URL or None if not available."""
+def write_file_manifest(model, manifest):
+    """Write the <manifest> of the files downloaded for <model>."""
+
+    path = os.path.join(create_package_archive_dir(model), FILE_MANIFEST)
+    manifest = {
+        k: v for k, v in manifest.items() if is_url(k) or os.path.exists(k)
+    }
+    write_atomically(path, json.dumps(manifest, indent=2).encode("utf-8"))
 
-    filename = os.path.basename(url).split("?")[0]
-    info = urllib.request.urlopen(url).getheader("Content-Disposition")
-    if info:
-        _, params = cgi.parse_header(info)
-        if "filename" in params:
-            filename = params["filename"]
 
-    return filename or None
+def record_file_checksum(manifest, path, sha256):
+    """Record the SHA-256 checksum <sha256> of the file <path> in
+<manifest>."""
 
+    stat = os.stat(path)
+    manifest[path] = {
+        "sha256": sha256,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
 
-def download_model_pkg(url, local, pkgfile, quiet):
-    """Download the model package mlm or zip file from <url> to <local>."""
 
-    if not quiet:
-        print("Package " + url + "\n")
+def check_file(path, sha256=None, size=None, manifest=None):
+    """Check if the file <path> has the SHA-256 checksum <sha256> and
+    <size> bytes, either of which is not checked if None.
 
-    meta = urllib.request.urlopen(url)
-    if meta.status != 200:
-        raise ModelURLAccessException(url)
+    The checksum recorded in <manifest> is used if the size and
+    modification time of <path> are unchanged since, otherwise <path> is
+    hashed and the checksum recorded.
+    """
 
-    # Content-Length is not always necessarily available.
+    stat = os.stat(path)
+    if size is not None and stat.st_size != int(size):
+        return False
 
-    dsize = meta.getheader("Content-Length")
-    if dsize is not None:
-        dsize = "{:,}".format(int(dsize))
+    if sha256 is None:
+        return True
 
-    if not quiet:
-        msg = "Downloading '{}'".format(pkgfile)
-        if dsize is not None:
-            msg += " ({} bytes)".format(dsize)
-        msg += " ...\n"
-        print(msg)
+    if manifest is None:
+        manifest = {}
 
-    # Download the archive from the URL.
+    entry = manifest.get(path)
+    if (
+        entry is None
+        or entry["size"] != stat.st_size
+        or entry["mtime"] != stat.st_mtime_ns
+    ):
+        record_file_checksum(manifest, path, hash_file(path).hexdigest())
 
-    try:
-        urllib.request.urlretrieve(url, local)
-    except urllib.error.URLError as error:
-        raise ModelDownloadHaltException(url, error.reason.lower())
+    return manifest[path]["sha256"] == sha256.lower()
 
 
 # ----------------------------------------------------------------------
@@ -449,6 +1897,9 @@ def unpack_with_promote(file, dest, valid_name=None, remove_dst=True):
     Return whether promotion happened and the top level dir if did.
     """
 
+    import tarfile
+    import zipfile
+
     logger = logging.getLogger(__name__)
 
     # Check if need to remove <dest>.
@@ -461,14 +1912,19 @@ def unpack_with_promote(file, dest, valid_name=None, remove_dst=True):
     if valid_name is None:
         valid_name = file
 
-    if is_mlm_zip(valid_name):
-        opener, lister_name, appender_name = (
+    is_zip = is_mlm_zip(valid_name)
+    if is_zip:
+        opener, lister_name, members_name = (
             zipfile.ZipFile,
             "namelist",
-            "write",
+            "infolist",
         )
     else:
-        opener, lister_name, appender_name = tarfile.open, "getnames", "add"
+        opener, lister_name, members_name = (
+            tarfile.open,
+            "getnames",
+            "getmembers",
+        )
 
     # Unpack <file>.
 
@@ -477,14 +1933,8 @@ def unpack_with_promote(file, dest, valid_name=None, remove_dst=True):
         # Check if all files are under a top dir.
 
         file_list = getattr(pkg_file, lister_name)()
-        first_segs = [x.split(os.path.sep)[0] for x in file_list]
-        if (len(file_list) == 1 and os.path.sep in file_list[0]) or (
-            len(file_list) != 1
-            and all([x == first_segs[0] for x in first_segs])
-        ):
-            promote, top_dir = True, file_list[0].split(os.path.sep)[0]
-        else:
-            promote, top_dir = False, None
+        top_dir = get_archive_top_dir(file_list)
+        promote = top_dir is not None
 
         if not promote:  # All files are at the top level.
 
@@ -496,52 +1946,86 @@ def unpack_with_promote(file, dest, valid_name=None, remove_dst=True):
             logger.debug(
                 "Extract {} without top dir into {}".format(file, dest)
             )
+
+            # Strip the top dir from the name of each member and extract
+            # it straight into <dest>, in a single pass over <file>.
+            #
+            # Extraction can be done on a existing dir, without removing
+            # the dir first, and the extracted files can co-exist with
+            # the files already inside the dir, without affecting the
+            # existing files except they have the same name.
+
+            prefix = top_dir + os.path.sep
             file_list = []
-            with tempfile.TemporaryDirectory() as tmpdir:
-
-                # Extract file.
-
-                pkg_file.extractall(tmpdir)
-
-                with tempfile.TemporaryDirectory() as tmpdir2:
-
-                    # Repack files without top dir and then extract
-                    # again into <dest>.
-                    #
-                    # Extraction can be done on a existing dir,
-                    # without removing the dir first, and the
-                    # extracted files can co-exist with the files
-                    # already inside the dir, without affecting the
-                    # existing files except they have the same name.
-
-                    with opener(
-                        os.path.join(tmpdir2, "tmpball"), "w"
-                    ) as new_pkg_file:
-                        appender = getattr(new_pkg_file, appender_name)
-                        dir_path = os.path.join(tmpdir, top_dir)
-                        for path, dirs, files in os.walk(dir_path):
-                            for file in files:
-                                file_path = os.path.join(path, file)
-                                arc_path = os.path.relpath(file_path, dir_path)
-                                file_list.append(arc_path)
-                                appender(file_path, arc_path)
-
-                    with opener(
-                        os.path.join(tmpdir2, "tmpball")
-                    ) as new_pkg_file:
-                        new_pkg_file.extractall(dest)
+            for member in getattr(pkg_file, members_name)():
+                if is_zip:
+                    name = member.filename[len(prefix) :]
+                    if not name:  # The top dir itself.
+                        continue
+                    member.filename = name
+                    is_dir = member.is_dir()
+                else:
+                    name = member.name[len(prefix) :]
+                    if not name:
+                        continue
+                    member.name = name
+                    if member.islnk() and member.linkname.startswith(prefix):
+                        member.linkname = member.linkname[len(prefix) :]
+                    is_dir = member.isdir()
+
+                pkg_file.extract(member, dest)
+                if not is_dir:
+                    file_list.append(name.rstrip(os.path.sep))
 
             return True, top_dir, file_list
 
 
+def get_archive_top_dir(file_list):
+    """Return the top level dir all files in <file_list> are under, or None.
+
+    <file_list> is the list of member names of an archive file.
+    """
+
+    first_segs = [x.split(os.path.sep)[0] for x in file_list]
+    if (len(file_list) == 1 and os.path.sep in file_list[0]) or (
+        len(file_list) > 1 and all([x == first_segs[0] for x in first_segs])
+    ):
+        return first_segs[0]
+
+    return None
+
+
 def remove_file_or_dir(path):
     """Remove an existing file or directory."""
 
     if os.path.exists(path):
-        if os.path.isfile(path):
-            os.remove(path)
-        else:
+        if os.path.isdir(path):
             shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def write_atomically(path, content):
+    """Write bytes <content> into <path> via a temporary file, so that
+<path> is either the old or the new content, never a partial one.
+
+The file keeps the mode of the old <path>, or gets the one a newly
+created file would get, rather than the 0600 of the temporary file."""
+
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            os.fchmod(file.fileno(), mode)
+            file.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        remove_file_or_dir(tmp)
+        raise
 
 
 def make_symlink(src, dst):
@@ -883,16 +2367,23 @@ def flatten_mlhubyaml_deps(deps, cats=None, res=None):
     return res
 
 
+def get_dep_script_env(yes=False):
+    """Return the environment variables of the dependency scripts."""
+
+    env = {"_MLHUB_PYTHON_EXE": sys.executable}
+    if yes:
+        env["_MLHUB_OPTION_YES"] = "y"
+
+    return env
+
+
 def install_r_deps(deps, model, source="cran", yes=False):
-    env_var = 'export _MLHUB_OPTION_YES="y"; ' if yes else ""
-    env_var += 'export _MLHUB_PYTHON_EXE="{}"; '.format(sys.executable)
+    env = get_dep_script_env(yes)
     script = os.path.join(os.path.dirname(__file__), "scripts", "dep", "r.R")
-    command = '{}{} {} "{}" "{}"'.format(
-        env_var, RSCRIPT_CMD, script, source, '" "'.join(deps)
-    )
+    command = [RSCRIPT_CMD, script, source] + list(deps)
 
-    proc = subprocess.Popen(
-        command, shell=True, cwd=get_package_dir(model), stderr=subprocess.PIPE
+    proc = popen(
+        command, env=env, cwd=get_package_dir(model), stderr=subprocess.PIPE
     )
     output, errors = proc.communicate()
     if proc.returncode != 0:
@@ -911,8 +2402,7 @@ def install_r_deps(deps, model, source="cran", yes=False):
 
 
 def install_python_deps(deps, model, source="pip", yes=False):
-    env_var = 'export _MLHUB_OPTION_YES="y"; ' if yes else ""
-    env_var += 'export _MLHUB_PYTHON_EXE="{}"; '.format(sys.executable)
+    env = get_dep_script_env(yes)
     script = os.path.join(
         os.path.dirname(__file__), "scripts", "dep", "python.sh"
     )
@@ -938,7 +2428,7 @@ def install_python_deps(deps, model, source="pip", yes=False):
             category = "file"
             deps = first_dep[list(first_dep)[0]]
             with open(os.path.join(pkg_dir, deps), "r") as file:
-                name = yaml.load(file, Loader=yaml.SafeLoader)["name"]
+                name = load_yaml(file)["name"]
             update_conda_env_name(model, name)
         elif (
             list(first_dep)[0] == "name"
@@ -946,25 +2436,16 @@ def install_python_deps(deps, model, source="pip", yes=False):
             update_conda_env_name(model, first_dep[list(first_dep)[0]])
             return
 
-        command = '{}{} {} "{}" {} {} "{}"'.format(
-            env_var,
-            BASH_CMD,
-            script,
-            pkg_dir,
-            source,
-            category,
-            '" "'.join(deps) if isinstance(deps, list) else deps,
-        )
+        command = [BASH_CMD, script, pkg_dir, source, category]
+        command += list(deps) if isinstance(deps, list) else [deps]
     else:
         if source.startswith("pip"):
-            env_var += get_py_pkg_path_env(model)
+            env.update(get_py_pkg_path_env(model))
 
-        command = '{}{} {} "{}" {} "{}"'.format(
-            env_var, BASH_CMD, script, pkg_dir, source, '" "'.join(deps)
-        )
+        command = [BASH_CMD, script, pkg_dir, source] + list(deps)
 
-    proc = subprocess.Popen(
-        command, shell=True, cwd=get_package_dir(model), stderr=subprocess.PIPE
+    proc = popen(
+        command, env=env, cwd=get_package_dir(model), stderr=subprocess.PIPE
     )
     output, errors = proc.communicate()
     if proc.returncode != 0:
@@ -977,22 +2458,27 @@ def install_python_deps(deps, model, source="pip", yes=False):
 
 
 def install_system_deps(deps, yes=False):
-    env_var = 'export _MLHUB_OPTION_YES="y"; ' if yes else ""
-    env_var += 'export _MLHUB_PYTHON_EXE="{}"; '.format(sys.executable)
+    env = get_dep_script_env(yes)
     script = os.path.join(
         os.path.dirname(__file__), "scripts", "dep", "system.sh"
     )
-    command = '{}{} {} "{}"'.format(
-        env_var, BASH_CMD, script, '" "'.join(deps)
-    )
+    command = [BASH_CMD, script] + list(deps)
 
-    proc = subprocess.Popen(command, shell=True, stderr=subprocess.PIPE)
+    proc = popen(command, env=env, stderr=subprocess.PIPE)
     output, errors = proc.communicate()
     if proc.returncode != 0:
         raise ConfigureFailedException(errors.decode("utf-8"))
 
 
-def install_file_deps(deps, model, downloadir=None, key=None, yes=False):
+def install_file_deps(
+    deps,
+    model,
+    downloadir=None,
+    key=None,
+    yes=False,
+    jobs=DOWNLOAD_JOBS,
+    connections=1,
+):
     """Install file dependencies.
 
     For example, if MLHUB.yaml is
@@ -1008,6 +2494,10 @@ def install_file_deps(deps, model, downloadir=None, key=None, yes=False):
                                                      #      be unzipped into res/path/to/xxx
         - https://zzz.org/z.zip:     ./              # URL: The same as above
         - https://zzz.org/uvw.zip:   res/rst.zip     # URL: Download to res/rst.zip
+        - https://zzz.org/big.RData:                 # URL: Download to data/, and check its
+            target: data/                            #      SHA-256 checksum and size, both optional
+            sha256: 5d41402abc4b2a76b9719d911017c592...
+            size: 1234567
 
         - description/README.md                        # Move to package root dir
         - res/tree.RData:            resource/         # Move to resource/
@@ -1032,6 +2522,7 @@ def install_file_deps(deps, model, downloadir=None, key=None, yes=False):
         'https://zzz.org/xyz.zip':   'res/',
         'https://zzz.org/z.zip':     './',
         'https://zzz.org/uvw.zip':   'res/rst.zip',
+        'https://zzz.org/big.RData': {'target': 'data/', 'sha256': '5d41...', 'size': 1234567},
 
         'description/README.md':     None,
         'res/tree.RData':            'resource/',
@@ -1122,247 +2613,402 @@ def install_file_deps(deps, model, downloadir=None, key=None, yes=False):
 
     # Setup
 
-    cache_dir = create_package_cache_dir(model)
-    archive_dir = create_package_archive_dir(model)
     pkg_dir = get_package_dir(model)
-    maybe_private = False
-    repo_obj = None
 
     logger = logging.getLogger(__name__)
     logger.info("Install file dependencies.")
     logger.debug("deps: {}".format(deps))
 
-    # Avoid 403 errors which result when the header identifies itself
-    # as python urllib and thus the web site assumes it is a robot. We
-    # are not a robot but a user downloading a file.
-    
-    opener = urllib.request.build_opener()
-    opener.addheaders = [('User-agent', 'Mozilla/5.0')]
-    urllib.request.install_opener(opener)
+    # Deal with URL and path differently.
+    #
+    # If <location> is a path, it is a package file should be
+    # installed during `ml install`,
+    # elif <location> is a URL, it is a file downloaded during `ml
+    # configure`.
+
+    url_deps = []
+    path_deps = []
+    for location, target in deps.items():
+        checksum = {}
+        if isinstance(target, dict):  # With checksum of the file
+            checksum = {
+                k: target[k] for k in ("sha256", "size") if k in target
+            }
+            target = target.get("target")
+
+        if is_url(location) or RepoTypeURL.is_repo_ref(location):
+            if downloadir is None:
+                url_deps.append((location, target, checksum))
+        elif downloadir is not None:
+            path_deps.append((location, target, None))
+
+    # URL for non-package files
+    #
+    # Up to <jobs> files are downloaded and uncompressed at the same
+    # time.  The messages of each file, which tell whether it was
+    # downloaded or found in the cache, are printed from here in the
+    # order of <deps> once it is done, so that they do not interleave.
+    # On a failure or an interrupt, the downloads still running are told
+    # to stop by <cancel>.
 
     if downloadir is None:
         print("\n*** Downloading required files ...")
 
-    for location, target in deps.items():
+    cancel = threading.Event()
+
+    manifest = read_file_manifest(model) if url_deps else {}
+    if url_deps:
+        get_http_session(max(jobs, 1) * max(connections, 1))
+    executor = concurrent.futures.ThreadPoolExecutor(max(jobs, 1))
+    futures = [
+        executor.submit(
+            download_file_dep,
+            location,
+            target,
+            model,
+            connections,
+            manifest=manifest,
+            cancel=cancel,
+            **checksum,
+        )
+        for location, target, checksum in url_deps
+    ]
+
+    try:
+        pending = set(futures)
+        for (location, target, _), future in zip(url_deps, futures):
+
+            # Fail as soon as any download fails, not only once the ones
+            # before it are done.
+
+            while not future.done():
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for other in done:
+                    other.result()
+
+            messages, symlinks, repo_obj = future.result()
+
+            if repo_obj is not None:  # Maybe private repo
+                path_deps.append((location, target, repo_obj))
+                continue
+
+            print("\n".join(messages), flush=True)
+            for origin, goal in symlinks:
+                make_symlink(origin, goal)
+    except BaseException:
+        cancel.set()
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+
+        # After a failure, the downloads still running are not waited
+        # for.  The manifest records what is done so far, from a copy
+        # since they may still add to it until they stop.
 
-        # Deal with URL and path differently.
+        executor.shutdown(wait=False)
+        if manifest:
+            write_file_manifest(model, dict(manifest))
+
+    for location, target, repo_obj in path_deps:
+
+        # Path for package files or private Git repo
         #
-        # If <location> is a path, it is a package file should be
-        # installed during `ml install`,
-        # elif <location> is a URL, it is a file downloaded during `ml
-        # configure`.
+        # Move the files from download dir to package dir.
 
-        if downloadir is None and (
-            is_url(location) or RepoTypeURL.is_repo_ref(location)
-        ):
+        try:
+            goal = os.path.join(pkg_dir, "" if target is None else target)
+            if location.endswith(
+                "*"
+            ):  # Move all files under <location> to package's root dir
+                origin = os.path.join(downloadir, location[:-2])
+                merge_folder(origin, goal)
+            else:
 
-            # URL for non-package files
-            #
-            # Download file into Cache dir, then symbolically link it
-            # into Package dir.  Thus we can reuse the downloaded
-            # files after model package upgrade.
+                with tempfile.TemporaryDirectory() as mlhubtmpdir:
+
+                    if repo_obj is not None:
+                        origin = os.path.join(mlhubtmpdir, repo_obj.repo)
+                        errors = clone_repo(
+                            repo_obj.get_ssh_clone_url(),
+                            repo_obj.ref,
+                            origin,
+                            key,
+                        )
+                        if errors is not None:
+                            raise ConfigureFailedException(errors)
+
+                        if repo_obj.path:
+                            origin = os.path.join(origin, repo_obj.path)
+                    else:
+                        origin = os.path.join(downloadir, location)
+                    if os.path.isdir(origin) and not goal.endswith(
+                        os.path.sep
+                    ):
+                        merge_folder(origin, goal)
+                    else:
+                        os.makedirs(os.path.dirname(goal), exist_ok=True)
+                        shutil.move(origin, goal)
+        except FileNotFoundError:
+            raise ModelPkgInstallationFileNotFoundException(location)
+
+
+def download_file_dep(
+    location,
+    target,
+    model,
+    connections=1,
+    sha256=None,
+    size=None,
+    manifest=None,
+    cancel=None,
+):
+    """Download the file dependency <location> of <model> into its cache.
+
+    Download file into Cache dir, uncompress it if needed.  The
+    downloaded files will be symbolically linked into Package dir, thus
+    we can reuse the downloaded files after model package upgrade.  See
+    install_file_deps() for <location> and <target>, and download_url()
+    for <connections> and <cancel>.
+
+    If <sha256> or <size> is given, the file is checked against it, and
+    downloaded again if a cached copy does not match.  The checksums are
+    recorded in <manifest>, see read_file_manifest().
+
+    It is run concurrently with other downloads, so nothing is printed
+    here.
+
+    Returns:
+        messages: list of messages about the download.
+        symlinks: list of (src, dst) symbolic links to be made.
+        repo_obj: RepoTypeURL object if <location> may be a private
+                  repo which needs to be cloned instead, otherwise None.
+    """
+
+    cache_dir = create_package_cache_dir(model)
+    archive_dir = create_package_archive_dir(model)
+    pkg_dir = get_package_dir(model)
+    messages = []
 
-            # Determine file name, type, real location and path
+    # Determine file name, type, real location and path
 
-            logger.debug("Download file from URL: {}".format(location))
-            filetype = (
-                "file"  # The type of the item to be download: file, repo, dir
+    logger = logging.getLogger(__name__)
+    logger.debug("Download file from URL: {}".format(location))
+    filetype = "file"  # The type of the item to be download: file, repo, dir
+    path = None  # The path of the item in the repo
+    foldername = None
+    immutable = False  # Whether the item is of a given commit
+
+    if RepoTypeURL.is_repo_ref(location):
+        repo_obj = RepoTypeURL.get_repo_obj(location)
+        repo_obj.pin_ref()
+        immutable = repo_obj.is_commit_ref()
+        path = repo_obj.path
+        try:
+            filetype, location = repo_obj.get_res_type()
+        except ModelPkgDependencyFileNotFoundException:  # Maybe private repo
+            return messages, [], repo_obj
+
+    # The name of the file to be downloaded.  Unless known from a previous
+    # download, by this model or into the store, it is told by the
+    # response to <location>, which is then downloaded from if needed, so
+    # that <location> is requested once.  A cached, stored or partial
+    # download is thus found without requesting <location> first.
+
+    response = None
+    if manifest is None:
+        manifest = {}
+    record = read_store_record(location) or {}
+    if filetype != "file":
+        filename = repo_obj.get_repo_zip_filename()
+    elif "filename" in manifest.get(location, {}):
+        filename = manifest[location]["filename"]
+    elif record.get("filename"):
+        filename = record["filename"]
+    else:
+        try:
+            response = urlopen(location)
+        except urllib.error.HTTPError:
+            raise ModelPkgDependencyFileNotFoundException(location)
+        except urllib.error.URLError as error:
+            raise ModelDownloadHaltException(
+                location, str(error.reason).lower()
             )
-            path = None  # The path of the item in the repo
-            foldername = None
+        filename = get_response_filename(response, location)
 
-            if RepoTypeURL.is_repo_ref(location):
-                repo_obj = RepoTypeURL.get_repo_obj(location)
-                path = repo_obj.path
-                try:
-                    filetype, location = repo_obj.get_res_type()
-                except ModelPkgDependencyFileNotFoundException:  # Maybe private repo
-                    maybe_private = True
+    if filename is None:
 
-            if not maybe_private:
-                filename = get_url_filename(
-                    location
-                )  # The name of the file to be downloaded
+        # TODO: The file name cannot be determined from URL.
+        #       How to deal with this scenario?  Current
+        #       solution: We give it a random name.  This
+        #       should not occur.
 
-                if filename is None:
+        filename = "mlhubtmp-" + str(uuid.uuid4().hex)
 
-                    # TODO: The file name cannot be determined from URL.
-                    #       How to deal with this scenario?  Current
-                    #       solution: We give it a random name.  This
-                    #       should not occur.
+    # Recorded now, so that a partial download is resumed by the next
+    # attempt even if this one fails.
 
-                    filename = "mlhubtmp-" + str(uuid.uuid4().hex)
+    if filetype == "file":
+        manifest[location] = {"filename": filename}
 
-                is_archive = filetype != "file" or is_archive_file(filename)
+    is_archive = filetype != "file" or is_archive_file(filename)
 
-                # Determine target: relative path of the file under the
-                # package dir
+    # Determine target: relative path of the file under the
+    # package dir
 
-                if filetype == "repo":
-                    foldername = repo_obj.repo
-                elif filetype == "dir":
-                    foldername = path.split("/")[-1]
+    if filetype == "repo":
+        foldername = repo_obj.repo
+    elif filetype == "dir":
+        foldername = path.split("/")[-1]
 
-                if target is None:
-                    if filetype == "file":  # Use filename if not specified
-                        target = filename
-                    else:  # Use repo or dir name if not specified
-                        target = os.path.join(foldername, "")
-                else:
-                    if filetype == "file":
-                        if (
-                            target.endswith(os.path.sep) and not is_archive
-                        ):  # Download into a specified folder
-                            target = os.path.join(target, filename)
-                    else:
-                        if target.endswith(
-                            os.path.sep
-                        ):  # Unzip repo/dir into a folder with the same name
-                            target = os.path.join(target, foldername, "")
-                        else:  # Unzip repo/dir into a folder with a different name
-                            target = os.path.join(target, "")
-
-                if target.endswith(os.path.sep):  # Expand path
-                    target = (
-                        os.path.relpath(target) + os.path.sep
-                    )  # Ensure folder end with '/'
-                else:
-                    target = os.path.relpath(target)
+    if target is None:
+        if filetype == "file":  # Use filename if not specified
+            target = filename
+        else:  # Use repo or dir name if not specified
+            target = os.path.join(foldername, "")
+    else:
+        if filetype == "file":
+            if (
+                target.endswith(os.path.sep) and not is_archive
+            ):  # Download into a specified folder
+                target = os.path.join(target, filename)
+        else:
+            if target.endswith(
+                os.path.sep
+            ):  # Unzip repo/dir into a folder with the same name
+                target = os.path.join(target, foldername, "")
+            else:  # Unzip repo/dir into a folder with a different name
+                target = os.path.join(target, "")
+
+    if target.endswith(os.path.sep):  # Expand path
+        target = (
+            os.path.relpath(target) + os.path.sep
+        )  # Ensure folder end with '/'
+    else:
+        target = os.path.relpath(target)
 
-                need_unzip = target.endswith(os.path.sep) and is_archive
+    need_unzip = target.endswith(os.path.sep) and is_archive
 
-                # Determine cache: absolute path of the file cached
+    # Determine cache: absolute path of the file cached
 
-                cache = os.path.join(cache_dir, target)
+    cache = os.path.join(cache_dir, target)
 
-                # Determine archive: absolute path of the archive file
-                # downloaded
+    # Determine archive: absolute path of the archive file
+    # downloaded
 
-                archive = cache  # Where the file is archived, the same as cache if no need to unzip
-                if need_unzip:
-                    archive = os.path.join(
-                        archive_dir, target, filename
-                    )  # unzip file if target is a dir
+    archive = cache  # Where the file is archived, the same as cache if no need to unzip
+    if need_unzip:
+        archive = os.path.join(
+            archive_dir, target, filename
+        )  # unzip file if target is a dir
 
-                # Download file
+    # Download file
 
-                download_msg = "\n    * {}"
-                print(download_msg.format(location))
+    download_msg = "\n    * {}"
+    messages.append(download_msg.format(location))
 
-                reuse = False
-                download_msg = "      downloading into {} ..."
+    reuse = False
+    download_msg = "      downloading into {} ..."
 
-                if os.path.exists(archive):
+    if os.path.exists(archive) and not check_file(
+        archive, sha256, size, manifest
+    ):
+        logger.debug("Checksum mismatch: {}".format(archive))
+        remove_stored_file(location)
+        remove_file_or_dir(archive)
+        download_msg = "      checksum mismatch, downloading again into {} ..."
 
-                    # 20190327 gjw for now cache management is behind
-                    # scenes and do not need to ask for each one. If
-                    # already in cache then don't download. If user wants
-                    # to download then maybe have a --force or simply
-                    # REMOVE and INSTALL the model again, or delete the
-                    # downloaded file manually.
+    elif os.path.exists(archive):
 
-                    download_msg = "      using cached copy found in {} ..."
-                    reuse = True
+        # 20190327 gjw for now cache management is behind
+        # scenes and do not need to ask for each one. If
+        # already in cache then don't download. If user wants
+        # to download then maybe have a --force or simply
+        # REMOVE and INSTALL the model again, or delete the
+        # downloaded file manually.
 
-                print(download_msg.format(os.path.join(pkg_dir, target)))
+        download_msg = "      using cached copy found in {} ..."
+        reuse = True
 
-                if not reuse:
-                    os.makedirs(os.path.dirname(archive), exist_ok=True)
+    elif fetch_stored_file(location, archive, immutable):
 
-                    try:
-                        urllib.request.urlretrieve(location, archive)
-                    except urllib.error.HTTPError:
-                        raise ModelPkgDependencyFileNotFoundException(location)
-
-                # Install: unzip if necessary and make symbolic links
-
-                src = cache
-                dst = os.path.join(pkg_dir, target)
-                symlinks = [(src, dst)]
-                if need_unzip:  # Uncompress archive file
-                    print(
-                        "      Uncompressing the cached file {} ...".format(
-                            archive
-                        )
-                    )
-                    if filetype != "dir":
-                        _, _, file_list = unpack_with_promote(
-                            archive, cache, remove_dst=False
-                        )
-                    else:
-                        with tempfile.TemporaryDirectory() as tmpdir:
-                            unpack_with_promote(
-                                archive, tmpdir, remove_dst=False
-                            )
-                            file_list = merge_folder(
-                                os.path.join(tmpdir, path, ""), cache
-                            )
-
-                    symlinks = [
-                        (os.path.join(src, file), os.path.join(dst, file))
-                        for file in file_list
-                    ]
-
-                for origin, goal in symlinks:
-                    make_symlink(origin, goal)
+        # Downloaded already for another model.
 
-        if (
-            downloadir is not None
-            and not (is_url(location) or RepoTypeURL.is_repo_ref(location))
-            or maybe_private
+        if check_file(archive, sha256, size, manifest):
+            download_msg = "      using stored copy for {} ..."
+            reuse = True
+        else:
+            remove_stored_file(location)
+            remove_file_or_dir(archive)
+
+    messages.append(download_msg.format(os.path.join(pkg_dir, target)))
+
+    if not reuse:
+        os.makedirs(os.path.dirname(archive), exist_ok=True)
+
+        digest = hashlib.sha256()
+        try:
+            validator = download_url(
+                location,
+                archive,
+                connections=connections,
+                digest=digest,
+                response=response,
+                cancel=cancel,
+            )
+        except urllib.error.HTTPError:
+            raise ModelPkgDependencyFileNotFoundException(location)
+        except (
+            urllib.error.URLError,
+            http.client.HTTPException,
+            ConnectionError,
+            TimeoutError,
+        ) as error:
+            reason = getattr(error, "reason", "connection closed early")
+            raise ModelDownloadHaltException(location, str(reason).lower())
+
+        digest = digest.hexdigest()
+        if (sha256 is not None and digest != sha256.lower()) or (
+            size is not None and os.path.getsize(archive) != int(size)
         ):
+            remove_file_or_dir(archive)
+            raise ModelPkgDependencyFileChecksumException(location)
 
-            # Path for package files or private Git repo
-            #
-            # Move the files from download dir to package dir.
+        store_file(location, archive, validator, digest, filename)
+        record_file_checksum(manifest, archive, digest)
 
-            try:
-                goal = os.path.join(pkg_dir, "" if target is None else target)
-                if location.endswith(
-                    "*"
-                ):  # Move all files under <location> to package's root dir
-                    origin = os.path.join(downloadir, location[:-2])
-                    merge_folder(origin, goal)
-                else:
+    elif response is not None:
+        response.close()
+
+    # Install: unzip if necessary and make symbolic links
+
+    src = cache
+    dst = os.path.join(pkg_dir, target)
+    symlinks = [(src, dst)]
+    if need_unzip:  # Uncompress archive file
+        messages.append(
+            "      Uncompressing the cached file {} ...".format(archive)
+        )
+        with _unpack_lock:
+            if filetype != "dir":
+                _, _, file_list = unpack_with_promote(
+                    archive, cache, remove_dst=False
+                )
+            else:
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    unpack_with_promote(archive, tmpdir, remove_dst=False)
+                    file_list = merge_folder(
+                        os.path.join(tmpdir, path, ""), cache
+                    )
+
+        symlinks = [
+            (os.path.join(src, file), os.path.join(dst, file))
+            for file in file_list
+        ]
 
-                    with tempfile.TemporaryDirectory() as mlhubtmpdir:
-
-                        if maybe_private:
-                            identity_env = (
-                                "GIT_SSH_COMMAND='ssh -i {}' ".format(key)
-                                if key
-                                else ""
-                            )
-                            command = "cd {}; {}git clone {}; cd {}; git checkout {}".format(
-                                mlhubtmpdir,
-                                identity_env,
-                                repo_obj.get_ssh_clone_url(),
-                                repo_obj.repo,
-                                repo_obj.ref,
-                            )
-                            proc = subprocess.Popen(
-                                command, shell=True, stderr=subprocess.PIPE
-                            )
-                            output, errors = proc.communicate()
-                            if proc.returncode != 0:
-                                raise ConfigureFailedException(
-                                    errors.decode("utf-8")
-                                )
-
-                            origin = os.path.join(mlhubtmpdir, repo_obj.repo)
-                            if repo_obj.path:
-                                origin = os.path.join(origin, repo_obj.path)
-                        else:
-                            origin = os.path.join(downloadir, location)
-                        if os.path.isdir(origin) and not goal.endswith(
-                            os.path.sep
-                        ):
-                            merge_folder(origin, goal)
-                        else:
-                            os.makedirs(os.path.dirname(goal), exist_ok=True)
-                            shutil.move(origin, goal)
-            except FileNotFoundError:
-                raise ModelPkgInstallationFileNotFoundException(location)
+    return messages, symlinks, None
 
 
 # ----------------------------------------------------------------------
@@ -1370,6 +3016,26 @@ def install_file_deps(deps, model, downloadir=None, key=None, yes=False):
 # ----------------------------------------------------------------------
 
 
+def clone_repo(url, ref, dest, key=None):
+    """Clone the git repo at <url> into <dest> and check out <ref>,
+using the SSH private key <key> if given.
+
+    Return the errors of git if it failed, else None.
+    """
+
+    env = {"GIT_SSH_COMMAND": "ssh -i {}".format(key)} if key else {}
+    for cmd, cwd in (
+        (["git", "clone", url, dest], None),
+        (["git", "checkout", ref], dest),
+    ):
+        proc = popen(cmd, env=env, cwd=cwd, stderr=subprocess.PIPE)
+        output, errors = proc.communicate()
+        if proc.returncode != 0:
+            return errors.decode("utf-8")
+
+    return None
+
+
 class RepoTypeURL(ABC):
 
     REPO_DOMAINS = {
@@ -1531,6 +3197,115 @@ class RepoTypeURL(ABC):
     def get_ssh_clone_url(self):
         return "git@{}:{}/{}.git".format(self.ssh_host, self.owner, self.repo)
 
+    def get_repo_zip_filename(self):
+        """Return the file name of the repo's zipball, as GitHub names it."""
+
+        return "{}-{}.zip".format(self.repo, self.ref.replace("/", "-"))
+
+    def read_api_url(self, url, headers=None):
+        """Read the response of the hosting service's API at <url> through
+        a local cached copy, see read_cached_url().
+
+        The cached copy is revalidated by a conditional request each time,
+        which GitHub does not count against its rate limit, unless the ref
+        is a full commit SHA whose content never changes.
+        """
+
+        if self.is_commit_ref():
+            return read_cached_url(url, ttl=float("inf"), headers=headers)
+
+        return read_cached_url(url, ttl=0, headers=headers)
+
+    def read_raw_url(self, url):
+        """Read the raw file at <url>, through a local cached copy kept for
+        good if the ref is a full commit SHA."""
+
+        if self.is_commit_ref():
+            return read_cached_url(url, ttl=float("inf"))
+
+        return read_url(url)
+
+    def is_commit_ref(self):
+        """Check if the ref is a full commit SHA."""
+
+        return re.fullmatch("[0-9a-f]{40}", self.ref.lower()) is not None
+
+    @abstractmethod
+    def query_commit_sha(self):
+        """Query the hosting service for the SHA of the commit of the ref."""
+        return None
+
+    def pin_ref(self):
+        """Resolve the ref, a branch or a tag, to the SHA of its commit.
+
+        The URLs composed afterwards are then of content which never
+        changes, thus cached for good.  A ref is resolved again after
+        REF_CACHE_TTL seconds, by a request revalidating the cached
+        response, see read_api_url().  The refs of pull requests are left
+        as is, as is any ref which cannot be resolved, such as one of a
+        private repo or one when the API rate limit is exceeded.
+
+        Return the ref.
+        """
+
+        logger = logging.getLogger(__name__)
+
+        if self.is_commit_ref() or self.ref.startswith(
+            ("pull/", "merge_requests/", "pull-requests/")
+        ):
+            return self.ref
+
+        try:
+            with open(REF_CACHE_FILE, "r") as file:
+                refs = json.load(file)
+        except (OSError, ValueError):
+            refs = {}
+
+        now = time.time()
+        refs = {
+            k: v for k, v in refs.items() if 0 <= now - v[1] < REF_CACHE_TTL
+        }
+
+        key = "{}:{}/{}@{}".format(
+            self.prefix, self.owner, self.repo, self.ref
+        )
+        if key in refs:
+            sha = refs[key][0]
+        else:
+            try:
+                sha = self.query_commit_sha()
+            except urllib.error.HTTPError as error:
+                if error.code in (403, 429):  # Over the API rate limit
+                    msg = "Rate limited, not resolving {}"
+                    logger.debug(msg.format(key))
+                else:
+                    msg = "Cannot resolve {}"
+                    logger.debug(msg.format(key), exc_info=True)
+                return self.ref
+            except (urllib.error.URLError, ValueError, KeyError, TypeError):
+                logger.debug("Cannot resolve {}".format(key), exc_info=True)
+                return self.ref
+
+            if not isinstance(sha, str) or not re.fullmatch(
+                "[0-9a-f]{40}", sha.lower()
+            ):
+                logger.debug("Cannot resolve {}: {}".format(key, sha))
+                return self.ref
+
+            refs[key] = [sha, now]
+            try:
+                os.makedirs(os.path.dirname(REF_CACHE_FILE), exist_ok=True)
+                write_atomically(
+                    REF_CACHE_FILE, json.dumps(refs).encode("utf-8")
+                )
+            except OSError:
+                logger.warning("Failed to save {}".format(REF_CACHE_FILE))
+
+        logger.debug("Pin {} to {}".format(key, sha))
+        self.ref = sha
+
+        return sha
+
 
 class GitHubURL(RepoTypeURL):
     def compose_repo_zip_url(self):
@@ -1568,9 +3343,7 @@ class GitHubURL(RepoTypeURL):
         else:
             try:
                 res = json.loads(
-                    urllib.request.urlopen(
-                        self.compose_content_url(api=True)
-                    ).read()
+                    self.read_api_url(self.compose_content_url(api=True))
                 )
             except urllib.error.HTTPError:
                 raise ModelPkgDependencyFileNotFoundException(self.url)
@@ -1586,10 +3359,20 @@ class GitHubURL(RepoTypeURL):
 
     def read_raw_file(self):
         if self.url.lower().split("/")[2] == "api.github.com":
-            res = json.loads(urllib.request.urlopen(self.url).read())
+            res = json.loads(self.read_api_url(self.url))
             return base64.b64decode(res["content"])
         else:
-            return urllib.request.urlopen(self.url).read()
+            return self.read_raw_url(self.url)
+
+    def query_commit_sha(self):
+        """Query the SHA of the commit of the ref on GitHub."""
+
+        url = "https://api.github.com/repos/{}/{}/commits/{}".format(
+            self.owner, self.repo, self.ref
+        )
+        headers = {"Accept": "application/vnd.github.sha"}
+
+        return self.read_api_url(url, headers).decode("utf-8").strip()
 
     def interpret(self):
         """Interpret GitHub URL into user name, repo name, ref and path.  If a
@@ -1603,7 +3386,7 @@ class GitHubURL(RepoTypeURL):
         """
 
         logger = logging.getLogger(__name__)
-        logger.info("Interpret GitHub location.")
+        logger.debug("Interpret GitHub location.")
         logger.debug("URL: {}".format(self.url))
 
         url = self.remove_prefix()
@@ -1693,14 +3476,19 @@ class GitLabURL(RepoTypeURL):
             self.res_type = "repo"
             self.composed_url = self.compose_repo_zip_url()
         else:
+            # Only the headers of the raw file are requested, as it may be
+            # large and is downloaded later anyway.
+
             try:
-                urllib.request.urlopen(self.compose_content_url(api=True))
+                urlopen(
+                    self.compose_content_url(api=True), method="HEAD"
+                ).close()
             except urllib.error.HTTPError:
                 try:
                     res = json.loads(
-                        urllib.request.urlopen(
+                        self.read_api_url(
                             self.compose_content_url(api=True, tree=True)
-                        ).read()
+                        )
                     )
                 except urllib.error.HTTPError:
                     raise ModelPkgDependencyFileNotFoundException(self.url)
@@ -1718,7 +3506,16 @@ class GitLabURL(RepoTypeURL):
         return self.res_type, self.composed_url
 
     def read_raw_file(self):
-        return urllib.request.urlopen(self.url).read()
+        return self.read_raw_url(self.url)
+
+    def query_commit_sha(self):
+        """Query the SHA of the commit of the ref on GitLab."""
+
+        url = "https://gitlab.com/api/v4/projects/{}%2F{}/repository/commits/{}".format(
+            self.owner, self.repo, urllib.parse.quote(self.ref, safe="")
+        )
+
+        return json.loads(self.read_api_url(url))["id"]
 
     def interpret(self):
         """Interpret GitLab URL into user name, repo name, ref and path.  If a
@@ -1730,7 +3527,7 @@ class GitLabURL(RepoTypeURL):
         """
 
         logger = logging.getLogger(__name__)
-        logger.info("Interpret GitLab location.")
+        logger.debug("Interpret GitLab location.")
         logger.debug("URL: {}".format(self.url))
 
         url = self.remove_prefix()
@@ -1808,9 +3605,7 @@ class BitbucketURL(RepoTypeURL):
             self.composed_url = self.compose_content_url(api=True)
 
             try:
-                res = json.loads(
-                    urllib.request.urlopen(self.composed_url).read()
-                )
+                res = json.loads(self.read_api_url(self.composed_url))
             except urllib.error.HTTPError:
                 raise ModelPkgDependencyFileNotFoundException(self.url)
 
@@ -1824,7 +3619,16 @@ class BitbucketURL(RepoTypeURL):
         return self.res_type, self.composed_url
 
     def read_raw_file(self):
-        return urllib.request.urlopen(self.url).read()
+        return self.read_raw_url(self.url)
+
+    def query_commit_sha(self):
+        """Query the SHA of the commit of the ref on Bitbucket."""
+
+        url = "https://api.bitbucket.org/2.0/repositories/{}/{}/commit/{}".format(
+            self.owner, self.repo, self.ref
+        )
+
+        return json.loads(self.read_api_url(url))["hash"]
 
     def interpret(self):
         """Interpret Bitbucket URL into user name, repo name, ref and path.  If
@@ -1836,7 +3640,7 @@ class BitbucketURL(RepoTypeURL):
         """
 
         logger = logging.getLogger(__name__)
-        logger.info("Interpret GitLab location.")
+        logger.debug("Interpret GitLab location.")
         logger.debug("URL: {}".format(self.url))
 
         url = self.remove_prefix()
@@ -1883,16 +3687,25 @@ class BitbucketURL(RepoTypeURL):
 
 
 def read_repo_raw_file(name):
-    """Read the raw file from a repo of a hosting service."""
+    """Read the raw file from a repo of a hosting service.
+
+    The content of a URL is only fetched once in a process, until
+    clear_description_cache().
+    """
 
     if not is_url(name):
         return open(name)
-    else:
+
+    content = _raw_file_cache.get(name)
+    if content is None:
         repo_obj = RepoTypeURL.get_repo_obj(name)
         if repo_obj:
-            return repo_obj.read_raw_file()
+            content = repo_obj.read_raw_file()
         else:
-            return urllib.request.urlopen(name).read()
+            content = read_url(name)
+        _raw_file_cache[name] = content
+
+    return content
 
 
 # ----------------------------------------------------------------------
@@ -2045,7 +3858,7 @@ Packages.yaml in current working dir.
         packagesyaml (str): YAML file which will hold meta data in all MLHUB.yaml.
     """
 
-    entry = yaml.load(open(mlmodelsyaml), Loader=yaml.SafeLoader)
+    entry = load_yaml(open(mlmodelsyaml))
     model_list = list(entry.keys())
     model_list.sort()
     failed_models = []
@@ -2105,7 +3918,9 @@ Packages.yaml in current working dir.
         packagesyaml (str): YAML file which will hold meta data in all MLHUB.yaml.
     """
 
-    meta = yaml.load(open(mlmodelsyaml), Loader=yaml.SafeLoader)
+    import yaml
+
+    meta = load_yaml(open(mlmodelsyaml))
     model_list = list(meta.keys())
     model_list.sort()
     failed_models = []
@@ -2132,8 +3947,8 @@ Packages.yaml in current working dir.
                 continue
 
             try:
-                entry = yaml.load(content, Loader=yamlordereddictloader.Loader)
-            except (yaml.composer.ComposerError, yaml.scanner.ScannerError):
+                entry = load_yaml(content, ordered=True)
+            except yaml.YAMLError:
                 failed_models.append(model)
                 continue
 
@@ -2149,19 +3964,56 @@ Packages.yaml in current working dir.
         )
 
 
+def load_config(model):
+    """Return the config of <model> as a dict, empty if not configured.
+
+    The config file is only loaded once in a process, unless it is
+    replaced or modified since.
+    """
+
+    config_file = os.path.join(get_package_config_dir(model), CONFIG_FILE)
+    try:
+        stat = os.stat(config_file)
+    except FileNotFoundError:
+        return {}
+
+    key = (stat.st_ino, stat.st_mtime_ns)
+    cached = _config_cache.get(config_file)
+    if cached is None or cached[0] != key:
+        with open(config_file, "r") as file:
+            cached = (key, load_yaml(file) or {})
+        _config_cache[config_file] = cached
+
+    return dict(cached[1])
+
+
 def update_config(model, entry):
-    """Update model package config file with entry."""
+    """Update model package config file with entry.
+
+    The config file is rewritten under an exclusive lock on the config
+    dir of the model, so that concurrent updates are not lost, and
+    replaced atomically, so that it is never read half written.  Locking
+    the dir leaves no lock file behind.
+    """
+
+    import yaml
 
     config_file = get_package_config_file(model)
 
-    if os.path.exists(config_file):
-        with open(config_file, "r") as file:
-            old_entry = yaml.load(file, Loader=yaml.SafeLoader)
-            old_entry.update(entry)
-            entry = old_entry
+    lock = os.open(os.path.dirname(config_file), os.O_RDONLY)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        config = {}
+        if os.path.exists(config_file):
+            with open(config_file, "r") as file:
+                config = load_yaml(file) or {}
+        config.update(entry)
 
-    with open(config_file, "w") as file:
-        yaml.dump(entry, file, default_flow_style=False)
+        content = yaml.dump(config, default_flow_style=False)
+        write_atomically(config_file, content.encode("utf-8"))
+    finally:
+        os.close(lock)
 
 
 def update_conda_env_name(model, name):
@@ -2184,14 +4036,7 @@ def update_sys_python_pkg_usage(model, usage=True):
 def get_config(model, name):
     """Return config value."""
 
-    config_file = get_package_config_file(model)
-    if os.path.exists(config_file):
-        with open(config_file, "r") as file:
-            entry = yaml.load(file, Loader=yaml.SafeLoader)
-        if name in entry:
-            return entry[name]
-
-    return None
+    return load_config(model).get(name)
 
 
 def get_working_dir(model):
@@ -2210,7 +4055,34 @@ def get_sys_python_pkg_usage(model):
     return get_config(model, SYS_PYTHON_PKG_USAGE)
 
 
-def get_py_pkg_path_env(model):
+def get_download_connections(model):
+    """Return the number of connections to download a large file of
+<model>, 1 if not configured or invalid."""
+
+    connections = get_config(model, CONNECTIONS)
+    if not connections:
+        return 1
+
+    try:
+        if int(connections) >= 1:
+            return int(connections)
+    except (TypeError, ValueError):
+        pass
+
+    print_on_stderr(
+        "Warning: invalid value '{}' of {} in the config of {}, using 1.",
+        connections,
+        CONNECTIONS,
+        model,
+    )
+
+    return 1
+
+
+def get_py_pkg_paths(model):
+    """Return the bin dir and the site dir of the Python packages
+installed for <model>."""
+
     python_pkg_base = os.path.sep.join([get_package_dir(model), ".python"])
     python_pkg_path = python_pkg_base + site.USER_SITE
     python_pkg_bin = python_pkg_base + site.USER_BASE + "/bin"
@@ -2228,9 +4100,45 @@ def get_py_pkg_path_env(model):
         if get_sys_python_pkg_usage(model):
             print_on_stderr(MSG_INCOMPATIBLE_PYTHON_ENV, model)
 
-    return "export PATH=\"{}:$PATH\"; export PYTHONPATH='{}'; ".format(
-        python_pkg_bin, python_pkg_path
-    )
+    return python_pkg_bin, python_pkg_path
+
+
+def get_py_pkg_path_env(model):
+    """Return the environment variables to use the Python packages
+installed for <model>."""
+
+    python_pkg_bin, python_pkg_path = get_py_pkg_paths(model)
+
+    return {
+        "PATH": python_pkg_bin + os.pathsep + os.environ.get("PATH", ""),
+        "PYTHONPATH": python_pkg_path,
+    }
+
+
+def get_conda_env_prefix(name):
+    """Return the dir of the conda environment <name>, or None if it is
+not found or has activation scripts, so that it needs `conda activate`."""
+
+    envs = os.path.join(os.path.expanduser("~"), ".conda", "environments.txt")
+    try:
+        with open(envs, "r") as file:
+            prefixes = file.read().splitlines()
+    except OSError:
+        return None
+
+    for prefix in prefixes:
+        prefix = prefix.strip()
+        if (
+            os.path.basename(prefix) == name
+            and os.path.basename(os.path.dirname(prefix)) == "envs"
+            and os.path.exists(os.path.join(prefix, "bin", "python"))
+        ):
+            activate = os.path.join(prefix, "etc", "conda", "activate.d")
+            if os.path.isdir(activate) and os.listdir(activate):
+                return None
+            return prefix
+
+    return None
 
 
 # ----------------------------------------------------------------------
@@ -2256,7 +4164,7 @@ def update_completion_list(completion_file, new_words):
     """
 
     logger = logging.getLogger(__name__)
-    logger.info("Update bash completion cache.")
+    logger.debug("Update bash completion cache.")
     logger.debug("Completion file: {}".format(completion_file))
     logger.debug("New completion words: {}".format(new_words))
 
@@ -2268,6 +4176,8 @@ def update_completion_list(completion_file, new_words):
             logger.debug("Old Completion words: {}".format(old_words))
 
         words = old_words | new_words
+        if words == old_words:
+            return
     else:
         words = new_words
 
@@ -2321,6 +4231,9 @@ def get_model_completion_list():
 def find_best_match(misspelled, candidates):
     """Find the best matched word with <misspelled> in <candidates>."""
 
+    from rapidfuzz import fuzz
+    from rapidfuzz import process as fuzzprocess
+
     best_match = fuzzprocess.extractOne(
         misspelled, candidates, scorer=fuzz.ratio
     )
@@ -2377,6 +4290,20 @@ def get_misspelled_pkg(model):
 # -----------------------------------------------------------------------
 
 
+def get_command_name(name, commands=COMMANDS):
+    """Return the basic command in <commands> named <name> or with the
+alias <name>, or None if there is not."""
+
+    if name in commands:
+        return name
+
+    for cmd in commands:
+        if name in commands[cmd].get("alias", ()):
+            return cmd
+
+    return None
+
+
 class SubCmdAdder(object):
     """Add the subcommands described in <commands> into <subparsers> with
 corresponding functions defined in <module>."""
@@ -2468,6 +4395,51 @@ def create_log_dir():
     )
 
 
+class LazyLogFileHandler(logging.Handler):
+    """Log handler which writes into the log file <filename>, rotated once
+    it reaches <max_bytes> with <backup_count> old ones kept.
+
+    The log dir and file are only created when the first record is
+    emitted, so that commands logging nothing above the level of the
+    handler do not touch the file system at all.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0):
+        super().__init__()
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.handler = None
+
+    def emit(self, record):
+        if self.handler is None:
+            # Drop the records logged while opening the file, such as
+            # the error of failing to create the log dir, and do not try
+            # again if it fails.
+
+            self.handler = logging.NullHandler()
+            try:
+                create_log_dir()
+                handler = logging.handlers.RotatingFileHandler(
+                    self.filename,
+                    maxBytes=self.max_bytes,
+                    backupCount=self.backup_count,
+                )
+            except (OSError, LogDirCreateException):
+                self.handleError(record)
+                return
+
+            handler.setFormatter(self.formatter)
+            self.handler = handler
+
+        self.handler.emit(record)
+
+    def close(self):
+        if self.handler is not None:
+            self.handler.close()
+        super().close()
+
+
 def add_log_handler(logger, handler, level, fmt):
     """Add handler with level and format to logger"""
 
@@ -2503,6 +4475,332 @@ def print_error_exit(msg, *param, exitcode=1):
     sys.exit(exitcode)
 
 
+# ----------------------------------------------------------------------
+# Model server
+# ----------------------------------------------------------------------
+#
+# `ml serve <model>` keeps a Python process with the modules of <model>
+# imported.  `ml <cmd> <model>` then sends a request to run <cmd>.py to
+# the server over a Unix socket, together with its standard streams.
+# The server forks a child to run the script, so that each run starts
+# from the same warm state, and replies with the pid of the child and
+# finally with its exit code.
+
+
+def get_server_socket_path(model):
+    """Return the path of the socket of the server of <model>."""
+
+    return os.path.join(SERVER_DIR, model + ".sock")
+
+
+def connect_model_server(model):
+    """Return a socket connected to the server of <model>, or None if
+it is not running."""
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(get_server_socket_path(model))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+    return sock
+
+
+def send_server_request(sock, request, fds=()):
+    """Send <request> and the file descriptors <fds> through <sock>."""
+
+    data = json.dumps(request).encode("utf-8")
+    fds = array.array("i", fds)
+    sock.sendmsg([data[:1]], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+    sock.sendall(data[1:])
+    sock.shutdown(socket.SHUT_WR)
+
+
+def recv_server_request(conn):
+    """Return the request and the file descriptors sent through <conn>,
+or None if nothing was sent, as by connect_model_server()."""
+
+    fds = array.array("i")
+    size = fds.itemsize
+    data, ancdata, _, _ = conn.recvmsg(65536, socket.CMSG_LEN(3 * size))
+    for level, kind, fd_data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(fd_data[: len(fd_data) - len(fd_data) % size])
+    fds = list(fds)
+
+    if not data:
+        return None, fds
+
+    chunks = [data]
+    while data:
+        data = conn.recv(65536)
+        chunks.append(data)
+
+    return json.loads(b"".join(chunks)), fds
+
+
+def run_on_model_server(model, script, params, cwd, env, fds=(0, 1, 2)):
+    """Run the Python <script> with <params> in <cwd> and <env> on the
+server of <model>, with <fds> as its stdin, stdout and stderr.
+
+    Return the exit code of the script, or None if there is no server.
+    """
+
+    sock = connect_model_server(model)
+    if sock is None:
+        return None
+
+    logger = logging.getLogger(__name__)
+    logger.debug("Run {} on the server of {}".format(script, model))
+
+    request = {"script": script, "params": params, "cwd": cwd, "env": env}
+    with sock, sock.makefile("r") as reply:
+        send_server_request(sock, request, fds)
+        line = reply.readline()
+        if not line:
+            return None
+
+        # Ctrl-C is for the script run by the child, but signals can only
+        # be handled in the main thread.
+
+        pid = int(line)
+        if threading.current_thread() is not threading.main_thread():
+            line = reply.readline()
+        else:
+            handler = signal.signal(
+                signal.SIGINT, lambda signum, frame: os.kill(pid, signum)
+            )
+            try:
+                line = reply.readline()
+            finally:
+                signal.signal(signal.SIGINT, handler)
+
+    if not line:
+        logger.error(
+            "The server of {} exited while running {}".format(model, script)
+        )
+        return 1
+
+    return int(line)
+
+
+def stop_model_server(model):
+    """Stop the server of <model> if any, once its running scripts end.
+
+    Return whether there was a server.
+    """
+
+    sock = connect_model_server(model)
+    if sock is None:
+        return False
+
+    with sock:
+        send_server_request(sock, {"stop": True})
+        sock.recv(1)
+
+    return True
+
+
+def stop_model_servers():
+    """Stop the servers of all the models, see stop_model_server()."""
+
+    if not os.path.isdir(SERVER_DIR):
+        return
+
+    for name in os.listdir(SERVER_DIR):
+        if name.endswith(".sock"):
+            stop_model_server(name[: -len(".sock")])
+
+
+def serve_model(model, paths=(), preload=()):
+    """Serve requests to run the Python scripts of <model> until stopped.
+
+    Args:
+        model (str): name of the model.
+        paths (list): dirs to add to sys.path for the scripts.
+        preload (list): modules to import once in the server.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    path = get_server_socket_path(model)
+
+    sys.path[1:1] = paths
+    for name in preload:
+        logger.info("Preload {} for {}.".format(name, model))
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print_on_stderr("Failed to preload '{}': {}", name, e)
+
+    os.makedirs(SERVER_DIR, mode=0o700, exist_ok=True)
+    remove_file_or_dir(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+
+    # A child exiting wakes the loop up through <wakeup>, and SIGTERM
+    # stops the server like Ctrl-C.
+
+    wakeup, wakeup_w = socket.socketpair()
+    wakeup.setblocking(False)
+    wakeup_w.setblocking(False)
+    signal.set_wakeup_fd(wakeup_w.fileno())
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    selector.register(wakeup, selectors.EVENT_READ)
+
+    children = {}
+    stopper = None
+    logger.info("Serve {} at {}.".format(model, path))
+    try:
+        while stopper is None:
+            for key, _ in selector.select():
+                if key.fileobj is wakeup:
+                    try:
+                        while wakeup.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    reap_server_children(children)
+                    continue
+
+                conn, _ = server.accept()
+                try:
+                    request, fds = recv_server_request(conn)
+                except (OSError, ValueError) as e:
+                    logger.error("Bad request to {}: {}".format(model, e))
+                    conn.close()
+                    continue
+
+                if request is None:
+                    conn.close()
+                    continue
+
+                if request.get("stop"):
+                    stopper = conn
+                    break
+
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    code = 1
+                    try:
+                        signal.set_wakeup_fd(-1)
+                        for signum in (signal.SIGCHLD, signal.SIGTERM):
+                            signal.signal(signum, signal.SIG_DFL)
+                        signal.signal(
+                            signal.SIGINT, signal.default_int_handler
+                        )
+                        selector.close()
+                        server.close()
+                        conn.close()
+                        code = run_server_request(request, fds)
+                    finally:
+                        os._exit(code)
+
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = conn
+                try:
+                    conn.sendall("{}\n".format(pid).encode("utf-8"))
+                except OSError:
+                    pass
+    finally:
+        signal.set_wakeup_fd(-1)
+        selector.close()
+        server.close()
+        remove_file_or_dir(path)
+        wakeup.close()
+        wakeup_w.close()
+
+        # Let the running scripts end, also when interrupted, as Ctrl-C
+        # reaches them too.  Interrupting again stops waiting for them,
+        # and their clients are told the server exited.
+
+        try:
+            while children:
+                reap_server_children(children, block=True)
+        finally:
+            for conn in children.values():
+                conn.close()
+            if stopper is not None:
+                stopper.close()
+
+    logger.info("Stopped serving {}.".format(model))
+
+
+def reap_server_children(children, block=False):
+    """Reply the exit code of the ended <children> to their client."""
+
+    while children:
+        pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+        if pid == 0:
+            break
+
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+
+        with conn:
+            if os.WIFSIGNALED(status):
+                code = -os.WTERMSIG(status)
+            else:
+                code = os.WEXITSTATUS(status)
+            try:
+                conn.sendall("{}\n".format(code).encode("utf-8"))
+            except OSError:
+                pass
+
+
+def run_server_request(request, fds):
+    """Run the script of <request> in this child of the server, as
+`python <script> <params>` would, and return its exit code."""
+
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+
+    sys.stdin = open(0, "r", closefd=False)
+    buffering = 1 if os.isatty(1) else -1
+    sys.stdout = open(1, "w", buffering=buffering, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+    script = request["script"]
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = [script] + request["params"]
+    sys.path[0] = os.path.dirname(script)
+
+    try:
+        runpy.run_path(script, run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        code = e.code
+        if code is None:
+            code = 0
+        elif not isinstance(code, int):
+            print(code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except OSError:
+            pass
+
+    return code
+
+
 # ----------------------------------------------------------------------
 # Misc
 # ----------------------------------------------------------------------
@@ -2511,6 +4809,8 @@ def print_error_exit(msg, *param, exitcode=1):
 def configure(path, script, quiet):
     """Run the provided configure scripts and handle errors and output."""
 
+    import distro
+
     configured = False
 
     # For now only tested/working with Ubuntu
@@ -2518,18 +4818,16 @@ def configure(path, script, quiet):
     if distro.id() in ["debian", "ubuntu"]:
         conf = os.path.join(path, script)
         if os.path.exists(conf):
-            interp = interpreter(script)
+            interp, env = interpreter(script)
             if not quiet:
                 msg = "\nConfiguring using '{}'...\n".format(conf)
                 print(msg)
-            cmd = "export _MLHUB_CMD_CWD='{}'; export _MLHUB_MODEL_NAME='{}'; {} {}".format(
-                os.getcwd(), os.path.basename(path), interp, script
-            )
+            env["_MLHUB_CMD_CWD"] = os.getcwd()
+            env["_MLHUB_MODEL_NAME"] = os.path.basename(path)
+            cmd = interp + [script]
             logger = logging.getLogger(__name__)
-            logger.debug("(cd " + path + "; " + cmd + ")")
-            proc = subprocess.Popen(
-                cmd, shell=True, cwd=path, stderr=subprocess.PIPE
-            )
+            logger.debug("(cd {}; {})".format(path, " ".join(cmd)))
+            proc = popen(cmd, env=env, cwd=path, stderr=subprocess.PIPE)
             output, errors = proc.communicate()
             if proc.returncode != 0:
                 raise ConfigureFailedException(errors.decode("utf-8"))
@@ -2539,20 +4837,64 @@ def configure(path, script, quiet):
 
 
 def interpreter(script):
-    """Determine the correct interpreter for the given script name."""
+    """Determine the correct interpreter for the given script name.
+
+    Return the command line of the interpreter and the environment
+    variables it needs.
+    """
 
     (root, ext) = os.path.splitext(script)
     ext = ext.strip()
+    env = {}
     if ext == ".sh":
-        intrprt = BASH_CMD
+        intrprt = [BASH_CMD]
     elif ext == ".R":
-        intrprt = "R_LIBS=./R {}".format(RSCRIPT_CMD)
+        intrprt = [RSCRIPT_CMD]
+        env["R_LIBS"] = "./R"
     elif ext == ".py":
-        intrprt = sys.executable
+        intrprt = [sys.executable]
     else:
         raise UnsupportedScriptExtensionException(ext)
 
-    return intrprt
+    return intrprt, env
+
+
+def popen(cmd, env=None, **kwargs):
+    """Start the command line <cmd>, with <env> added to the environment,
+without going through a shell.
+
+    A missing program is raised as LackPrerequisiteException, as it was
+    diagnosed from the message of the shell before.
+    """
+
+    if env is not None:
+        env = dict(os.environ, **env)
+
+    try:
+        return subprocess.Popen(cmd, env=env, **kwargs)
+    except FileNotFoundError as e:
+        if e.filename != cmd[0]:
+            raise
+        raise LackPrerequisiteException(cmd[0])
+
+
+def tee_stream(fd, stream, limit):
+    """Copy what is read from <fd> to the binary <stream> as it comes,
+until the end, and return the last <limit> bytes of it."""
+
+    tail = bytearray()
+    while True:
+        data = os.read(fd, 65536)
+        if not data:
+            break
+
+        stream.write(data)
+        stream.flush()
+        tail += data
+        if len(tail) > limit:
+            del tail[: len(tail) - limit]
+
+    return bytes(tail)
 
 
 def yes_or_no(msg, *params, yes=True):
@@ -2563,6 +4905,9 @@ def yes_or_no(msg, *params, yes=True):
         yes (bool): Indicates whether the default answer is yes or no.
     """
 
+    if not _prompts_enabled:
+        raise PromptUnavailableException(msg.format(*params))
+
     print(msg.format(*params) + (" [Y/n]?" if yes else " [y/N]?"), end=" ")
     choice = input().lower()
 
@@ -2577,6 +4922,13 @@ def yes_or_no(msg, *params, yes=True):
     return answer
 
 
+def disable_prompts():
+    """Make yes_or_no() raise PromptUnavailableException from now on."""
+
+    global _prompts_enabled
+    _prompts_enabled = False
+
+
 # ----------------------------------------------------------------------
 # Custom Exceptions
 # ----------------------------------------------------------------------
@@ -2696,3 +5048,23 @@ class ModelPkgDependencyFileTypeUnknownException(Exception):
 
 class InstallFailedException(Exception):
     pass
+
+
+class ModelPkgDependencyFileChecksumException(Exception):
+    pass
+
+
+class ModelServerRunningException(Exception):
+    pass
+
+
+class ModelServerUnsupportedException(Exception):
+    pass
+
+
+class BatchFailedException(Exception):
+    pass
+
+
+class PromptUnavailableException(Exception):
+    pass
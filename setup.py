@@ -54,7 +54,6 @@ setup(
         'rapidfuzz',
         'pyyaml',
         'requests',
-        'yamlordereddictloader',
     ],
     include_package_data=True,
 )